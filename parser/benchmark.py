@@ -0,0 +1,177 @@
+import os, sys, json, time, argparse, tempfile, tracemalloc, subprocess
+
+from config import RES_DIR
+from parse import Parser, NodeTable, CFG_DIR
+
+BASELINE_FILE = os.path.join(RES_DIR, "benchmark_baseline.json")
+REPEAT = 5          # every stage is run this often, the fastest run counts
+TOLERANCE = 0.15    # a stage is reported as regression if it is this much slower than the baseline
+SCALE_SOURCE = "MotorwayWeavingSection_Area2"
+IMPORT_MODULES = ["config", "parse", "build", "run"]  # must be importable without side effects
+HEAVY_MODULES = ["matplotlib"]  # none of the IMPORT_MODULES may import these
+
+
+def stage_tokenize(file_path, state):
+    with open(file_path, "r") as f:
+        state["tokens"] = Parser.tokenize(f.read())
+
+def stage_nested_lists(file_path, state):
+    state["nested_lists"] = Parser.parse_to_nested_lists(state["tokens"])
+
+def stage_elements(file_path, state):
+    state["elements"] = Parser().get_lane_elements(state["nested_lists"])
+
+def stage_json_dump(file_path, state):
+    with tempfile.TemporaryFile("w") as json_file:
+        json.dump({"type": "Area2", "id": "aed1", "elements": state["elements"]}, json_file, indent=4)
+
+def stage_streaming(file_path, state):
+    state["elements"] = list(Parser.iter_lane_elements(file_path))
+
+# stages are run in this order and share the state of the previous stages
+STAGES = [
+    ("tokenize", stage_tokenize),
+    ("nested_lists", stage_nested_lists),
+    ("elements", stage_elements),
+    ("json_dump", stage_json_dump),
+    ("streaming", stage_streaming),
+]
+
+
+def benchmark_file(file_path, repeat=REPEAT):
+    """ Runs all STAGES on one cfg file.
+
+    Returns:
+        dict: stage name -> {"seconds", "mb_per_s", "elements_per_s", "peak_mb"}
+    """
+    size_mb = os.path.getsize(file_path) / 1e6
+    results = {}
+    state = {}
+    for name, stage in STAGES:
+        seconds = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stage(file_path, state)
+            seconds = min(seconds, time.perf_counter() - start)
+        tracemalloc.start()  # separate run, as tracing slows the stage down
+        stage(file_path, state)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        amount_elements = len(state["elements"]) if name in ("elements", "json_dump", "streaming") else 0
+        results[name] = {
+            "seconds": seconds,
+            "mb_per_s": size_mb / seconds,
+            "elements_per_s": amount_elements / seconds if amount_elements else None,
+            "peak_mb": peak / 1e6,
+        }
+    return results
+
+
+def create_scaled_file(target_mb, directory):
+    """ Creates a synthetic cfg of roughly target_mb by repeating the LaneCells of SCALE_SOURCE."""
+    with open(f"{CFG_DIR}/{SCALE_SOURCE}.cfg", "r") as f:
+        tokens = Parser.tokenize(f.read())
+    table = NodeTable(tokens)
+    lane_cells = ["\n".join(tokens[table.start[n]-1:table.end[n]]) for n in table.find("LaneCell ")]
+    chunk = "\n".join(lane_cells) + "\n"
+    repeats = max(1, int(target_mb * 1e6 / len(chunk)))
+    file_path = os.path.join(directory, f"synthetic_{target_mb}MB.cfg")
+    with open(file_path, "w") as f:
+        f.write(f"define Area2 Synthetic\n{{\n")
+        for _ in range(repeats):
+            f.write(chunk)
+        f.write("};\n")
+    return file_path
+
+
+def benchmark_import(module, repeat=REPEAT):
+    """ Imports module in a fresh interpreter, started in another working directory, so that 
+    relative paths and file I/O at import time would fail.
+
+    Returns:
+        dict: {"seconds", "heavy"} with heavy listing the HEAVY_MODULES which were imported
+    """
+    code = (f"import sys, time; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); "
+            f"start = time.perf_counter(); import {module}; seconds = time.perf_counter() - start; "
+            f"print(seconds, *[m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    seconds = float("inf")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", code], cwd=tmp_dir, capture_output=True, text=True, 
+                                    check=True).stdout.split()
+            seconds = min(seconds, float(output[0]))
+    return {"seconds": seconds, "heavy": output[1:]}
+
+
+def compare_imports(results, baseline):
+    """ Prints the import times and returns all regressions (slower or heavy modules imported)."""
+    regressions = []
+    print("imports")
+    for module, result in results.items():
+        line = f"    {module:<14} {result['seconds']*1000:9.2f} ms"
+        reference = baseline.get(module)
+        if reference:
+            change = result["seconds"] / reference["seconds"] - 1
+            line += f"  {change:+7.1%}"
+            if change > TOLERANCE:
+                line += "  REGRESSION"
+                regressions.append(f"import {module}")
+        if result["heavy"]:
+            line += f"  imports {', '.join(result['heavy'])}"
+            regressions.append(f"import {module}: {', '.join(result['heavy'])}")
+        print(line)
+    return regressions
+
+
+def compare(file_name, results, baseline):
+    """ Prints the results of one file and returns the names of all regressed stages."""
+    regressions = []
+    print(f"{file_name}")
+    for name, result in results.items():
+        elements_per_s = f"{result['elements_per_s']:11.0f}" if result["elements_per_s"] else f"{'-':>11}"
+        line = (f"    {name:<14} {result['seconds']*1000:9.2f} ms  {result['mb_per_s']:8.2f} MB/s  "
+                f"{elements_per_s} el/s  {result['peak_mb']:8.2f} MB peak")
+        reference = baseline.get(file_name, {}).get(name)
+        if reference:
+            change = result["seconds"] / reference["seconds"] - 1
+            line += f"  {change:+7.1%}"
+            if change > TOLERANCE:
+                line += "  REGRESSION"
+                regressions.append(f"{file_name}: {name}")
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the stages of parse.py on the bundled cfg files.")
+    arg_parser.add_argument("--save-baseline", action="store_true", help=f"store the results in {BASELINE_FILE}")
+    arg_parser.add_argument("--scale", type=int, nargs="*", default=[], metavar="MB",
+                            help="also benchmark synthetic files of the given sizes, e.g. --scale 10 100")
+    arg_parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = arg_parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+
+    all_results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_paths = [f"{CFG_DIR}/{f}" for f in sorted(os.listdir(CFG_DIR)) if f.endswith(".cfg")]
+        file_paths += [create_scaled_file(mb, tmp_dir) for mb in args.scale]
+        for file_path in file_paths:
+            file_name = os.path.basename(file_path)
+            all_results[file_name] = benchmark_file(file_path, args.repeat)
+            regressions += compare(file_name, all_results[file_name], baseline)
+    all_results["imports"] = {module: benchmark_import(module, args.repeat) for module in IMPORT_MODULES}
+    regressions += compare_imports(all_results["imports"], baseline.get("imports", {}))
+
+    if args.save_baseline:
+        baseline.update(all_results)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"Baseline written to {BASELINE_FILE}")
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,606 @@
+import os, json, argparse, time, hashlib
+from collections import deque
+
+from draw.aed import *
+from draw.course import *
+import draw.utils
+from draw.transform import Transform
+from draw.store import GeometryStore
+import export.xml
+from config import Config, DEFAULT as DEFAULT_CONFIG
+from cache import NpzCache
+
+# Enter the inverted values of a Node to ensure this one is (0, 0, 0 deg(E))
+GLOBAL_TRANSLATION = [100, 10]
+GLOBAL_ROTATION = 0
+
+CACHE_VERSION = 3  # increase whenever the built geometry changes, this invalidates the ScenarioCache
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# initial settings for Course: (x, y, angle)
+COURSE_START = (0, -3.625, 0)
+
+
+def load_scenario(file_name, config=None):
+    """ Reads parser/res/json/<file_name>.json (file_name without .json ending)."""
+    with open((config or DEFAULT_CONFIG).scenario_file(file_name), 'r') as f:
+        return json.load(f)
+
+
+class ObjectRegistry:
+    """ Index of all objects of a map: id -> object and the list of modules (Course / Area2).
+    Built once after the objects are created, all lookups are constant time. If the objects are 
+    views of a GeometryStore, it is available as registry.store.
+    """
+    def __init__(self, objects, store=None):
+        self.objects = objects
+        self.store = store
+        self.by_id = {}
+        self.modules = []        # in order of appearance; module ids (e.g. "aed1") are not unique
+        self.module_index = {}   # id(module) -> index in self.modules
+        for obj in objects:
+            self.by_id.setdefault(obj.id, obj)  # the first object wins, if an id is used twice
+            if obj.parent is not None and id(obj.parent) not in self.module_index:
+                self.module_index[id(obj.parent)] = len(self.modules)
+                self.modules.append(obj.parent)
+
+    def __getitem__(self, obj_id):
+        try:
+            return self.by_id[obj_id]
+        except KeyError:
+            raise KeyError(f"Object '{obj_id}' not found in map") from None
+
+    def __contains__(self, obj_id):
+        return obj_id in self.by_id
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def port(self, port_name):
+        """ Resolves e.g. "cp7.End" into (object, "End")."""
+        port_split = port_name.split(".")
+        return self[port_split[0]], port_split[1]
+
+    def parts(self, obj):
+        """ Returns all parts of the module the given object belongs to."""
+        return self.modules[self.module_index[id(obj.parent)]].parts
+
+
+def build_objects(map_content, config=None, workers=None, cache=None):
+    """ Creates all objects of the map (without any transformation applied, not even mirrored).
+
+    Area2 modules do not depend on anything else, so they are built in a pool of worker processes 
+    (workers=None: one per core, workers=1: everything in this process), which send the objects 
+    back as arrays (see objects_to_arrays). Meanwhile the Courses are built here, as each one starts 
+    where the previous one ended. Modules found in the ScenarioCache cache are not built at all.
+
+    Returns:
+        list: all instances of StraightCourse, CurveCourse, BezierCourse, StraightAED,
+              HermiteSplineAED, CircularArcAED
+    """
+    elements = map_content["elements"]
+    independent = {i for i, element in enumerate(elements) if element["type"] == "Area2"}
+    cached = {}
+    if cache is not None:
+        for i in independent:
+            data = cache.load_module(elements[i], None)
+            if data is not None:
+                cached[i] = data
+    to_build = [i for i in sorted(independent) if i not in cached]
+
+    workers = os.cpu_count() if workers is None else workers
+    executor, futures = None, {}
+    if workers > 1 and len(to_build) > 1:
+        from concurrent.futures import ProcessPoolExecutor  # imported here, as it pulls in multiprocessing
+        # the workers only get the geometry settings, not the exclusions of this session
+        worker_config = (config if config is not None else DEFAULT_CONFIG).geometry_config()
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = {i: executor.submit(build_module_arrays, elements[i], None, worker_config) for i in to_build}
+
+    objects = []  # note that StraightCourse and CurveCourse themselves again can contain multiple lanes
+    state = COURSE_START
+    try:
+        for i, element in enumerate(elements):
+            module_state = None if i in independent else state
+            data = None
+            if i in futures:
+                data = futures[i].result()
+            elif i in cached:
+                data = cached[i]
+            elif cache is not None and i not in independent:
+                data = cache.load_module(element, module_state)
+
+            if data is None:
+                module_objects, next_state = build_module(element, module_state, config)
+                if cache is not None:
+                    cache.store_module(element, module_state, objects_to_arrays(module_objects, next_state))
+            else:
+                module_objects, next_state = objects_from_arrays(data, config), tuple(data["state"].tolist())
+                if i in futures and cache is not None:
+                    cache.store_module(element, module_state, data)
+            objects.extend(module_objects)
+            if i not in independent:
+                state = next_state
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return objects
+
+
+def build_module(element, state=None, config=None):
+    """ Creates the objects of one module (Course or Area2) of the map.
+
+    Parameters:
+        element: the module as given in the scenario JSON
+        state: (x, y, angle) where the next Course starts; each Course continues where the
+               previous one ended
+        config: Config of the created objects (default: config.DEFAULT)
+
+    Returns:
+        tuple: (list of objects, state for the next module)
+    """
+    objects = []
+    x, y, angle = state if state is not None else COURSE_START
+    e_type = element["type"]
+    e_id = element["id"]
+
+    if e_type == "Course":
+        course = Course(e_id)
+        for road in element["elements"]:
+            c_type = road[1]
+            c_id = road[0]
+
+            if c_type == "Straight":
+                length = road[2]
+                straight = StraightCourse(length, x0=x, y0=y, angle=angle,
+                                      id=c_id, parent=course, config=config)
+                x, y = straight.calculate()
+                objects.append(straight)
+                course.parts.append(straight)
+
+            elif c_type == "Bend":
+                length = road[2]
+                radius = road[3]
+                curve = CurveCourse(length=length, radius=radius, x0=x, y0=y, angle0=angle,
+                                          id=c_id, parent=course, config=config)
+                x, y, angle = curve.calculate()
+                objects.append(curve)
+                course.parts.append(curve)
+
+            elif c_type == "Bezier":
+                x1 = road[2]
+                y1 = road[3]
+                angle1 = road[4]  # expects angle in degrees
+                bezier = BezierCourse(x0=x, y0=y, angle0=angle, x1=x1, y1=y1, angle1=angle1,
+                                      id=c_id, parent=course, config=config)
+                x, y, angle = bezier.calculate()
+                objects.append(bezier)
+                course.parts.append(bezier)
+
+            else:
+                raise ValueError("Road type not valid")
+    elif e_type == "Area2":
+        area = Area2(e_id)
+        for road in element["elements"]:
+            c_type = road["type"]
+            c_id = road["id"]
+            v = road["values"]
+
+            if c_type == "Straight":
+                x0 = v["x0"]; y0 = v["y0"]; x1 = v["x1"]; y1 = v["y1"]
+                d0 = v["DistToRef0"]; d1 = v["DistToRef1"]  # apparently for Straight, this is the correct offset
+                vector = draw.utils.vector_from_points((x0, y0), (x1, y1))
+                x0, y0 = draw.utils.translate_perpendicular((x0, y0), vector, d0)
+                x1, y1 = draw.utils.translate_perpendicular((x1, y1), vector, d1)
+                line = StraightAED(x0, y0, x1, y1, id=c_id, parent=area, config=config)
+                line.calculate()
+                objects.append(line)
+                area.parts.append(line)
+
+            elif c_type == "Bezier":
+                x0 = v["x0"]; y0 = v["y0"]; x1 = v["x1"]; y1 = v["y1"]
+                angle0 = v["Angle0"]; angle1 = v["Angle1"]
+                d0 = v["DistToRef0"]; d1 = v["DistToRef1"]
+                spline = HermiteSplineAED(x0, y0, angle0, x1, y1, angle1, id=c_id, parent=area, config=config)
+                spline.calculate()
+                spline.x0, spline.y0 = utils.translate_perpendicular(
+                    (spline.x0, spline.y0), utils.vector_from_angle(angle0), d0)
+                spline.x1, spline.y1 = utils.translate_perpendicular(
+                    (spline.x1, spline.y1), utils.vector_from_angle(angle1), d1)
+                objects.append(spline)
+                area.parts.append(spline)
+
+            elif c_type == "CircularArc":
+                x0 = v["x0"]; y0 = v["y0"]; angle0 = v["Angle0"]; angle1 = v["Angle1"]; r = v["r"]
+                d0 = v["DistToRef0"]; d1 = v["DistToRef1"]  # apparently for CircularArc, this is the correct offset
+
+                if d0 != d1:
+                    raise ValueError("This should not happen, I guess??")
+                arc = CircularArcAED(x0, y0, angle0, angle1, r + d0, id=c_id, parent=area, config=config)
+                arc.calculate()
+                objects.append(arc)
+                area.parts.append(arc)
+
+            else:
+                raise ValueError("Road type not valid")
+    else:
+        raise ValueError("Type not valid")
+    return objects, (x, y, angle)
+
+
+def build_module_arrays(element, state=None, config=None):
+    """ build_module for worker processes: the objects are returned as arrays (see 
+    objects_to_arrays), which are much cheaper to send back than pickled objects."""
+    objects, state = build_module(element, state, config)
+    return objects_to_arrays(objects, state)
+
+
+## Compact array form of objects, used by the worker processes and the ScenarioCache
+OBJECT_CLASSES = {cls.__qualname__: cls for cls in (StraightAED, CircularArcAED, HermiteSplineAED, StraightCourse, 
+                                                     CurveCourse, BezierCourse, StraightCourse.Lane, 
+                                                     CurveCourse.Lane, Course, Area2)}
+MISSING, VALUE, NONE = 0, 1, 2  # state of an attribute in the arrays
+SKIPPED_ATTRIBUTES = ("parent", "parts", "lanes")  # restored from the structure
+
+
+def encode_items(items, prefix):
+    """ Encodes the plain attributes of items as arrays: one float and one str matrix, each 
+    with the state (MISSING, VALUE, NONE) of every attribute."""
+    num_names, str_names = [], []
+    for item in items:
+        for name, value in vars(item).items():
+            if name in SKIPPED_ATTRIBUTES:
+                continue
+            if isinstance(value, str):
+                str_names.append(name) if name not in str_names else None
+            elif value is None or isinstance(value, (int, float, np.number)):
+                num_names.append(name) if name not in num_names else None
+    num = np.zeros((len(items), len(num_names)))
+    num_state = np.zeros((len(items), len(num_names)), dtype=np.int8)
+    strs = np.full((len(items), len(str_names)), "", dtype=object)
+    str_state = np.zeros((len(items), len(str_names)), dtype=np.int8)
+    for i, item in enumerate(items):
+        attributes = vars(item)
+        for j, name in enumerate(num_names):
+            if name in attributes:
+                value = attributes[name]
+                num_state[i, j] = NONE if value is None else VALUE
+                num[i, j] = 0 if value is None else value
+        for j, name in enumerate(str_names):
+            if name in attributes and isinstance(attributes[name], str):
+                str_state[i, j] = VALUE
+                strs[i, j] = attributes[name]
+            elif name in attributes:
+                str_state[i, j] = NONE
+    return {
+        f"{prefix}_classes": np.array([type(item).__qualname__ for item in items], dtype=str),
+        f"{prefix}_num_names": np.array(num_names, dtype=str),
+        f"{prefix}_num": num,
+        f"{prefix}_num_state": num_state,
+        f"{prefix}_str_names": np.array(str_names, dtype=str),
+        f"{prefix}_str": strs.astype(str),
+        f"{prefix}_str_state": str_state,
+    }
+
+
+def decode_items(data, prefix):
+    items = []
+    num_names = data[f"{prefix}_num_names"].tolist()
+    str_names = data[f"{prefix}_str_names"].tolist()
+    num, num_state = data[f"{prefix}_num"].tolist(), data[f"{prefix}_num_state"]
+    strs, str_state = data[f"{prefix}_str"].tolist(), data[f"{prefix}_str_state"]
+    for i, class_name in enumerate(data[f"{prefix}_classes"].tolist()):
+        item = OBJECT_CLASSES[class_name].__new__(OBJECT_CLASSES[class_name])
+        for j, name in enumerate(num_names):
+            if num_state[i, j] != MISSING:
+                setattr(item, name, num[i][j] if num_state[i, j] == VALUE else None)
+        for j, name in enumerate(str_names):
+            if str_state[i, j] != MISSING:
+                setattr(item, name, strs[i][j] if str_state[i, j] == VALUE else None)
+        items.append(item)
+    return items
+
+
+def objects_to_arrays(objects, state=None):
+    """ Encodes objects with their modules and lanes as a dict of NumPy arrays (optionally with the 
+    state returned by build_module)."""
+    modules, module_index = [], {}
+    for obj in objects:
+        if id(obj.parent) not in module_index:
+            module_index[id(obj.parent)] = len(modules)
+            modules.append(obj.parent)
+    lanes = [(i, lane) for i, obj in enumerate(objects) for lane in getattr(obj, "lanes", [])]
+    arrays = {}
+    arrays.update(encode_items(modules, "modules"))
+    arrays.update(encode_items(objects, "objects"))
+    arrays.update(encode_items([lane for _, lane in lanes], "lanes"))
+    arrays["objects_module"] = np.array([module_index[id(obj.parent)] for obj in objects], dtype=np.int32)
+    arrays["lanes_owner"] = np.array([i for i, _ in lanes], dtype=np.int32)
+    if state is not None:
+        arrays["state"] = np.array(state, dtype=float)
+    return arrays
+
+
+def objects_from_arrays(data, config=None):
+    """ Restores the objects encoded by objects_to_arrays, optionally with the given Config."""
+    modules = decode_items(data, "modules")
+    for module in modules:
+        module.parts = []
+    objects = decode_items(data, "objects")
+    for obj, m in zip(objects, data["objects_module"].tolist()):
+        obj.parent = modules[m]
+        if config is not None and config is not DEFAULT_CONFIG:
+            obj.config = config
+        obj.connection0 = None
+        obj.connection1 = None
+        if hasattr(type(obj), "Lane"):
+            obj.lanes = []
+        modules[m].parts.append(obj)
+    for lane, owner in zip(decode_items(data, "lanes"), data["lanes_owner"].tolist()):
+        lane.parent = objects[owner]
+        objects[owner].lanes.append(lane)
+    return objects
+
+
+## Create connections
+def create_connection(objX, anchorX, objY, anchorY):
+    if anchorX ==  "Begin":
+        attribute_name = "connection0"
+    else:  # "End"
+        attribute_name = "connection1"
+    if anchorY == "Begin":
+        value = 0
+    else:  # "End"
+        value = 1
+    # if getattr(objX, attribute_name) != None:
+    #     print("TODO: This might be worth noting")
+    setattr(objX, attribute_name, (objY, value))
+
+# for connection in map_content["Connections"]:
+#     conn0_split = connection[0].split(".")
+#     conn1_split = connection[1].split(".")
+#     conn0_id = conn0_split[1]
+#     conn1_id = conn1_split[1]
+#     obj0 = [obj for obj in objects if obj.id == conn0_id][0]
+#     obj1 = [obj for obj in objects if obj.id == conn1_id][0]
+#     create_connection(obj0, conn0_split[2], obj1, conn1_split[2])
+#     create_connection(obj1, conn1_split[2], obj0, conn1_split[2])
+
+
+def solve_custom_connections(registry, map_content):
+    """ Computes where the modules (Courses and Area2s) are moved by the "CustomConnections".
+
+    Each connection [target, current] moves the module of current onto target. The connections 
+    may be given in any order: the modules which are never moved are placed first, all other 
+    modules are placed in BFS order along the connections, so every module gets one composed 
+    transformation. A module which is reached by several connections is placed by the first one 
+    found. All objects are mirrored first (see Transform.mirror).
+
+    Returns:
+        list: one Transform per module of the registry (in order of registry.modules)
+    """
+    mirror = Transform.mirror()
+    transforms = [mirror for _ in registry.modules]
+    connections = map_content.get("CustomConnections", [])
+    if not connections:
+        return transforms
+    module_of = lambda obj: registry.module_index[id(obj.parent)]
+    edges = [[] for _ in registry.modules]  # target module -> [(connection, current module)]
+    moved = set()
+    for connection in connections:
+        target = module_of(registry.port(connection[0]["position"][0])[0])
+        current = module_of(registry.port(connection[1]["position"][0])[0])
+        edges[target].append((connection, current))
+        moved.add(current)
+
+    def port_state(port_name):
+        """ Returns (x, y, angle) of a port with the transformation of its module applied."""
+        obj, anchor = registry.port(port_name)
+        transform = transforms[module_of(obj)]
+        x, y = transform.apply_point(port_position(obj, anchor))
+        angle = obj.angle0 if anchor == "Begin" else obj.angle1
+        return x, y, transform.apply_angle(angle)
+
+    def side_state(side):
+        """ Returns (x, y, angle) of one side of a connection, averaging up to two positions."""
+        positions = side["position"] if len(side["position"]) > 1 else side["position"] * 2
+        (x0, y0, _), (x1, y1, _) = port_state(positions[0]), port_state(positions[1])
+        return (x0 + x1) / 2, (y0 + y1) / 2, port_state(side["angle"])[2]
+
+    roots = [m for m in range(len(registry.modules)) if m not in moved]
+    roots += [m for m in range(len(registry.modules)) if m in moved]  # for cycles without a fixed module
+    placed = set()
+    for root in roots:
+        if root in placed:
+            continue
+        placed.add(root)
+        queue = deque([root])
+        while queue:
+            target = queue.popleft()
+            for connection, current in edges[target]:
+                if current in placed:
+                    continue
+                x_t, y_t, angle_t = side_state(connection[0])
+                x_c, y_c, angle_c = side_state(connection[1])
+                # translate the current port onto the target port, then rotate around it
+                move = Transform.translation((x_t - x_c, y_t - y_c)).then(
+                    Transform.rotation(angle_t - angle_c, center=(x_t, y_t)))
+                transforms[current] = transforms[current].then(move)
+                placed.add(current)
+                queue.append(current)
+    return transforms
+
+
+def port_position(obj, anchor):
+    if anchor == "Begin":
+        return obj.x0, obj.y0
+    else:  # "End"
+        return obj.x1, obj.y1
+
+
+def build(map_content, rotation=GLOBAL_ROTATION, translation=GLOBAL_TRANSLATION, objects=None, config=None, 
+          workers=None):
+    """ Creates all objects, mirrors them and applies the CustomConnections and the global 
+    rotation / translation. All of these are composed into one Transform per module and applied 
+    in one batch. Afterwards all objects are calculated once, so that all derived attributes 
+    (e.g. the lanes of the Courses) are up to date.
+
+    The objects are copied into a GeometryStore, the registry holds views of its rows.
+
+    If objects is given (e.g. from the ScenarioCache), these are used instead of creating them.
+
+    Returns:
+        ObjectRegistry: of all created objects
+    """
+    if objects is None:
+        objects = build_objects(map_content, config, workers)
+    store = GeometryStore.from_objects(objects, config)
+    registry = ObjectRegistry(store.objects, store)
+    global_transform = Transform()
+    if rotation:
+        global_transform = global_transform.then(Transform.rotation(rotation))
+    if translation:
+        global_transform = global_transform.then(Transform.translation(translation))
+    module_transforms = [t.then(global_transform) for t in solve_custom_connections(registry, map_content)]
+    store.apply_transforms([module_transforms[registry.module_index[id(obj.parent)]] for obj in registry])
+    for obj in registry:
+        obj.calculate()
+    return registry
+
+
+class ScenarioCache(NpzCache):
+    """ On-disk cache of built scenarios, stored as .npz files in <config.cache_dir>/scenarios.
+
+    Two kinds of entries are stored:
+    - the fully built and transformed scenario, keyed by the contents of the scenario, the global 
+      rotation / translation, the geometry settings of the Config and CACHE_VERSION. A hit restores 
+      all objects directly, nothing is sampled or solved. The exclusions are not part of the key, 
+      as they are only applied when drawing and exporting.
+    - every single module before any transformation, keyed by its JSON and the position where it 
+      starts (Courses continue where the previous Course ended). On a miss of the first kind, only 
+      the changed modules are built again.
+    Entries are evicted like those of the parse.ParseCache, clear() removes all of them.
+    """
+    def __init__(self, cache_dir=None, max_bytes=None, config=None):
+        self.config = config if config is not None else DEFAULT_CONFIG
+        super().__init__(cache_dir if cache_dir is not None else os.path.join(self.config.cache_dir, "scenarios"), 
+                         max_bytes if max_bytes is not None else MAX_CACHE_BYTES)
+
+    @staticmethod
+    def hash(*parts):
+        sha = hashlib.sha1(str(CACHE_VERSION).encode())
+        for part in parts:
+            sha.update(b"|")
+            sha.update(part if isinstance(part, bytes) else repr(part).encode())
+        return sha.hexdigest()
+
+    def module_key(self, element, state):
+        return self.hash("module", json.dumps(element, sort_keys=True), 
+                         None if state is None else [float(v) for v in state], self.config.geometry_key())
+
+    def load_module(self, element, state):
+        """ Arrays (see objects_to_arrays) of the module built from element at state, or None."""
+        return self.read(self.module_key(element, state))
+
+    def store_module(self, element, state, arrays):
+        self.write(self.module_key(element, state), arrays)
+
+    def build_scenario(self, file_name, rotation=GLOBAL_ROTATION, translation=GLOBAL_TRANSLATION, workers=None):
+        """ Same as build(load_scenario(file_name), rotation, translation), using the cache."""
+        with open(self.config.scenario_file(file_name), 'rb') as f:
+            scenario = f.read()
+        key = self.hash("scenario", scenario, rotation, list(translation) if translation else None,
+                        self.config.geometry_key())
+        data = self.read(key)
+        if data is not None:
+            store = GeometryStore.from_arrays(data, self.config)
+            return ObjectRegistry(store.objects, store)
+        map_content = json.loads(scenario)
+        objects = build_objects(map_content, self.config, workers, cache=self)
+        registry = build(map_content, rotation, translation, objects=objects, config=self.config)
+        self.write(key, registry.store.to_arrays())
+        return registry
+
+
+def build_scenario(file_name, config=None, rotation=GLOBAL_ROTATION, translation=GLOBAL_TRANSLATION, use_cache=True,
+                   workers=None):
+    """ Loads and builds parser/res/json/<file_name>.json, from the ScenarioCache if possible."""
+    if use_cache:
+        return ScenarioCache(config=config).build_scenario(file_name, rotation, translation, workers)
+    return build(load_scenario(file_name, config), rotation, translation, config=config, workers=workers)
+
+
+def export_map(objects, lines_to_exclude, to_file_path=None):
+    """ Writes all objects (except the excluded lines) as OTS XML."""
+    xml_writer = export.xml.XmlWriter(inverse=False)
+    lines_to_exclude = set(lines_to_exclude)
+
+    ## Add all points. If there are two points, only add one of them
+    for obj in objects:
+        if isinstance(obj, CircularArcAED):
+            continue  # these might be to complicated, esp. in roundabouts (TODO: Implement solution for this)
+        for pt in obj.get_points():
+            added_point = xml_writer.find_point(pt.x, pt.y)
+            if pt.id[:-2] in lines_to_exclude:
+                continue
+            if added_point == None:
+                xml_writer.add_point(pt)
+
+    ## Add all links
+    for obj in objects:
+        if isinstance(obj, CircularArcAED):
+            continue  # these might be to complicated, esp. in roundabouts (TODO: Implement solution for this)
+        if isinstance(obj, StraightCourse) or isinstance(obj, CurveCourse):
+            for lane in obj.lanes:
+                if lane.id in lines_to_exclude:
+                    continue
+                p0 = xml_writer.find_point(lane.x0, lane.y0)
+                p1 = xml_writer.find_point(lane.x1, lane.y1)
+                link = xml_writer.add_link(lane.id, p0, p1)
+                if isinstance(obj, StraightCourse):
+                    xml_writer.link_type_straight(link)
+                if isinstance(obj, CurveCourse):
+                    xml_writer.link_type_arc(link, lane.radius, obj.direction)
+        else:
+            if obj.id in lines_to_exclude:
+                continue
+            p0 = xml_writer.find_point(obj.x0, obj.y0)
+            p1 = xml_writer.find_point(obj.x1, obj.y1)
+            link = xml_writer.add_link(obj.id, p0, p1)
+
+        if isinstance(obj, BezierCourse):  # Currently this has no Lanes (maybe we want to remove them anyway)
+            xml_writer.link_type_bezier(link)
+        if isinstance(obj, StraightCourse):
+            xml_writer.link_type_straight(link)
+        if isinstance(obj, CurveCourse):
+            xml_writer.link_type_arc(link, obj.radius, obj.direction)
+        if isinstance(obj, StraightAED):
+            xml_writer.link_type_straight(link)
+        if isinstance(obj, HermiteSplineAED):
+            xml_writer.link_type_bezier(link)
+    xml_writer.write(to_file_path=to_file_path)
+    return xml_writer
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Build a scenario and export it as OTS XML (no matplotlib needed).")
+    arg_parser.add_argument("file_name", help="scenario in parser/res/json, without .json ending")
+    arg_parser.add_argument("--exclude", default=None, help="JSON file with the lanes to exclude from the export")
+    arg_parser.add_argument("--output", default=None, help="XML file (default: parser/res/xml/<file_name>.xml)")
+    arg_parser.add_argument("--rotation", type=float, default=GLOBAL_ROTATION)
+    arg_parser.add_argument("--translation", type=float, nargs=2, default=GLOBAL_TRANSLATION)
+    arg_parser.add_argument("--no-cache", action="store_true", help="always build, do not use the ScenarioCache")
+    arg_parser.add_argument("--workers", type=int, default=None, 
+                            help="processes building the Area2 modules (default: one per core, 1: no pool)")
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    config = Config(exclude_file=args.exclude)
+    registry = build_scenario(args.file_name, config, args.rotation, args.translation, use_cache=not args.no_cache,
+                              workers=args.workers)
+    output = args.output or config.xml_file(args.file_name)
+    export_map(registry, config.lines_to_exclude, to_file_path=output)
+    print(f"Exported {len(registry)} objects to {output} in {time.perf_counter() - start:.3f} s")
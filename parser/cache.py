@@ -0,0 +1,69 @@
+import os, tempfile
+import numpy as np
+
+
+class NpzCache:
+    """ Directory of .npz entries (dicts of arrays) with least recently used eviction.
+
+    Subclasses decide what the keys are made of and which arrays are stored, see parse.ParseCache
+    and build.ScenarioCache. Entries are written atomically, so a reader never sees half an entry,
+    and removed oldest first once the directory grows larger than max_bytes.
+    """
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def write(self, key, arrays):
+        """ Writes the arrays atomically (temporary file + rename) as entry key and evicts old entries."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def read(self, key):
+        """ Returns the arrays of entry key as dict, or None if there is no such entry."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                data = dict(data)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        os.utime(path)  # mark as recently used
+        return data
+
+    def remove(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache fits into max_bytes."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def clear(self):
+        """ Removes all entries (and temporary files left by interrupted writes)."""
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith((".npz", ".tmp")):
+                    os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,201 @@
+import os
+import threading
+import misc
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+RES_DIR = os.path.join(PACKAGE_DIR, "res")
+
+
+class Config:
+    """ Settings shared by building, drawing and exporting a scenario.
+
+    Nothing is read from disk when a Config is created: the exclusions are loaded on first access
+    of lines_to_exclude. All paths default to parser/res, independent of the working directory.
+
+    Parameters:
+        tolerance: maximal distance (in meters) between a sampled curve and its polyline; the 
+            amount of points of every curve is derived from its curvature
+        num_points: fixed amount of points for every curve instead (None: use tolerance)
+        max_points: upper limit of points per curve
+        lane_positions: Lane#0 will be at 0, lane_positions[0], Lane#1 will be lane_positions[1]
+            meters from Lane#0, Lane#2 will be lane_positions[2] meters from Lane#0, ...
+        exclude_file: JSON list of line ids which are drawn dotted and are not exported (None: no 
+            exclusions)
+        show_labels: draw the id next to every line
+        font_size: font size of these labels
+        detail_scale: labels and direction arrows are only drawn when zoomed in to at most this many
+            meters per pixel
+        res_dir: directory containing json/, xml/ and cache/
+    """
+    def __init__(self, tolerance=0.01, num_points=None, max_points=10000, lane_positions=(0,), exclude_file=None, 
+                 show_labels=True, font_size=7, detail_scale=0.5, res_dir=RES_DIR):
+        self.tolerance = tolerance
+        self.num_points = num_points
+        self.max_points = max_points
+        self.lane_positions = list(lane_positions)
+        self.show_labels = show_labels
+        self.font_size = font_size
+        self.detail_scale = detail_scale
+        self.res_dir = res_dir
+        self.exclude_file = exclude_file
+        self._lines_to_exclude = None
+
+    @property
+    def json_dir(self):
+        return os.path.join(self.res_dir, "json")
+
+    @property
+    def xml_dir(self):
+        return os.path.join(self.res_dir, "xml")
+
+    @property
+    def cache_dir(self):
+        return os.path.join(self.res_dir, "cache")
+
+    def scenario_file(self, file_name):
+        """ Path of the scenario parser/res/json/<file_name>.json"""
+        return os.path.join(self.json_dir, f"{file_name}.json")
+
+    def xml_file(self, file_name):
+        return os.path.join(self.xml_dir, f"{file_name}.xml")
+
+    @property
+    def lines_to_exclude(self):
+        """ Exclusions of exclude_file, shared by everything using this Config."""
+        if self._lines_to_exclude is None:
+            self._lines_to_exclude = Exclusions(self.exclude_file)
+        return self._lines_to_exclude
+
+    @lines_to_exclude.setter
+    def lines_to_exclude(self, lines):
+        self._lines_to_exclude = lines if isinstance(lines, Exclusions) else Exclusions(ids=lines)
+
+    def __getstate__(self):
+        # the exclusions (with their lock and timer) belong to this session, a copy loads them again
+        state = self.__dict__.copy()
+        state["_lines_to_exclude"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def geometry_key(self):
+        """ All settings which change the built geometry (used as part of cache keys)."""
+        return (self.tolerance, self.num_points, self.max_points, tuple(self.lane_positions))
+
+    def geometry_config(self):
+        """ A new Config with only the settings of geometry_key() (and res_dir), e.g. to be sent to 
+        the worker processes of build.build_objects."""
+        return Config(self.tolerance, self.num_points, self.max_points, self.lane_positions, res_dir=self.res_dir)
+
+
+class Exclusions:
+    """ The ids of all excluded lines (drawn dotted, not exported) as an in-memory set.
+
+    Changes are saved to file (if given) delay seconds after the last one, or on flush(): many clicks
+    cause only one write, which replaces the file atomically (see misc.write_json). Every change can 
+    be undone (and redone). listeners are called with the id after every change, e.g. to restyle its 
+    line.
+
+    Parameters:
+        file: JSON list of ids, read on creation if it exists (None: not saved)
+        ids: initial ids, instead of the file content
+        delay: seconds to wait for further changes before writing
+    """
+    def __init__(self, file=None, ids=None, delay=1.0):
+        self.file = file
+        self.delay = delay
+        if ids is None and file is not None and os.path.exists(file):
+            ids = misc.read_json(file)
+        self.ids = set(ids or ())
+        self.history = []  # (id, added) of every change, see undo()
+        self.redo_history = []  # (id, added) of the undone changes, see redo()
+        self.listeners = []
+        self._notifying = False
+        self._timer = None
+        self._lock = threading.Lock()
+        self._unsaved = False
+
+    def __contains__(self, id):
+        return id in self.ids
+
+    def __iter__(self):
+        return iter(sorted(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, id):
+        """ Excludes id. Returns False if it already was."""
+        if id in self.ids:
+            return False
+        self._apply(id, True, self.history, (id, True), clear_redo=True)
+        return True
+
+    def discard(self, id):
+        """ Includes id again. Returns False if it was not excluded."""
+        if id not in self.ids:
+            return False
+        self._apply(id, False, self.history, (id, False), clear_redo=True)
+        return True
+
+    def undo(self):
+        """ Reverts the last change. Returns its id (None if there was nothing to undo)."""
+        if not self.history:
+            return None
+        id, added = self.history.pop()
+        self._apply(id, not added, self.redo_history, (id, added))
+        return id
+
+    def redo(self):
+        """ Applies the last undone change again. Returns its id (None if there was nothing to redo)."""
+        if not self.redo_history:
+            return None
+        id, added = self.redo_history.pop()
+        self._apply(id, added, self.history, (id, added))
+        return id
+
+    def _apply(self, id, add, history, entry, clear_redo=False):
+        """ Adds or removes id and appends entry to history (before any listener is called, so both 
+        stay consistent if a listener fails). Listeners must not change the exclusions."""
+        if self._notifying:
+            raise RuntimeError("Exclusions must not be changed by a listener")
+        with self._lock:
+            if add:
+                self.ids.add(id)
+            else:
+                self.ids.discard(id)
+            self._unsaved = True
+        history.append(entry)
+        if clear_redo:
+            self.redo_history.clear()
+        self._schedule_write()
+        self._notifying = True
+        try:
+            for listener in self.listeners:
+                listener(id)
+        finally:
+            self._notifying = False
+
+    def _schedule_write(self):
+        if self.file is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """ Writes pending changes now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with self._lock:
+            if self.file is not None and self._unsaved:
+                misc.write_json(self.file, self.ids)
+                self._unsaved = False
+
+
+# used by all objects which were not given a Config of their own
+DEFAULT = Config()
@@ -1,20 +1,12 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import export.utils
-import misc
+from config import DEFAULT as DEFAULT_CONFIG
 
 try:
     from draw import utils
 except:
     import utils
 
-NUM_POINTS = 100
-SHOW_LABELS = True
-FONT_SIZE = 7
-
-EXCLUDE_FILE = "parser/res/json/exclude03.json"
-LINES_TO_EXCLUDE = misc.read_json(EXCLUDE_FILE)
-
 
 class Area2:
     def __init__(self, id=""):
@@ -23,9 +15,15 @@ class Area2:
 
 
 class StraightAED:
-    def __init__(self, x0, y0, x1, y1, id="", parent=None):
+    POINT_ATTRIBUTES = (("x0", "y0"), ("x1", "y1"))  # see draw.store.GeometryStore.apply_transforms
+    ANGLE_ATTRIBUTES = ("angle0", "angle1")
+    config = DEFAULT_CONFIG  # see config.Config, set per object to use other settings
+
+    def __init__(self, x0, y0, x1, y1, id="", parent=None, config=None):
         self.id = id 
         self.parent = parent
+        if config is not None:
+            self.config = config
         self.connection0 = None
         self.connection1 = None
         self.x0 = x0 
@@ -74,7 +72,7 @@ class StraightAED:
 
     def calculate(self, ax=None):
         if ax:
-            if self.id in LINES_TO_EXCLUDE: 
+            if self.id in self.config.lines_to_exclude: 
                 linestyle = ":"
             else:
                 linestyle = "-"
@@ -82,8 +80,8 @@ class StraightAED:
             utils.plot_oriented_triangle((self.x1, self.y1), self.angle1, "blue", ax=ax)
             line.parent = self
             
-            if SHOW_LABELS:
-                ax.text((self.x0+self.x1)//2, (self.y0+self.y1)//2, self.id, color='blue', va='center', fontsize=FONT_SIZE)
+            if self.config.show_labels:
+                ax.text((self.x0+self.x1)//2, (self.y0+self.y1)//2, self.id, color='blue', va='center', fontsize=self.config.font_size)
                 # Optionally: Plot start and end
                 # if self.id == "l49":
                 #     ax.plot(self.x0, self.y0, marker='o', color='black', markersize=5)
@@ -92,9 +90,15 @@ class StraightAED:
     
 
 class CircularArcAED:
-    def __init__(self, cx, cy, angle0, angle1, r, id="", parent=None):
+    POINT_ATTRIBUTES = (("cx", "cy"),)  # see draw.store.GeometryStore.apply_transforms
+    ANGLE_ATTRIBUTES = ("angle0", "angle1")
+    config = DEFAULT_CONFIG  # see config.Config, set per object to use other settings
+
+    def __init__(self, cx, cy, angle0, angle1, r, id="", parent=None, config=None):
         self.id = id 
         self.parent = parent
+        if config is not None:
+            self.config = config
         self.connection0 = None
         self.connection1 = None
         self.cx = cx
@@ -143,31 +147,40 @@ class CircularArcAED:
         self.angle1 = -self.angle1
         return self
 
-    def calculate(self, ax=None):
-        # Generate the points (we dont need them now for drwaing, but later)
+    def polyline(self, tolerance=None):
+        """ The arc sampled within tolerance (default: config.tolerance), (points x 2). Only needed 
+        for drawing."""
         angle0 = utils.convert_angle(self.angle0, to="radians")
         angle1 = utils.convert_angle(self.angle1, to="radians")
-        angles = np.linspace(angle0, angle1, NUM_POINTS)
-        arc_x = self.cx + self.r * np.cos(angles)
-        arc_y = self.cy + self.r * np.sin(angles)
+        num_points = int(utils.arc_sample_count(self.r, angle1 - angle0, tolerance or self.config.tolerance,
+                                                self.config.max_points, self.config.num_points))
+        angles = np.linspace(angle0, angle1, num_points)
+        return np.column_stack([self.cx + self.r * np.cos(angles), self.cy + self.r * np.sin(angles)])
 
-        
-        self.x0 = arc_x[0]
-        self.y0 = arc_y[0]
-        self.x1 = arc_x[len(arc_x)-1]
-        self.y1 = arc_y[len(arc_y)-1]
+    def calculate(self, ax=None):
+        # The end points in closed form, the arc is only sampled for drawing (see polyline())
+        angles = np.array([utils.convert_angle(self.angle0, to="radians"), 
+                           utils.convert_angle(self.angle1, to="radians")])
+        end_x = self.cx + self.r * np.cos(angles)
+        end_y = self.cy + self.r * np.sin(angles)
+        self.x0 = end_x[0]
+        self.y0 = end_y[0]
+        self.x1 = end_x[1]
+        self.y1 = end_y[1]
 
         # Plot the arc
         if ax:
-            if self.id in LINES_TO_EXCLUDE: 
+            arc = self.polyline()
+            arc_x, arc_y = arc[:, 0], arc[:, 1]
+            if self.id in self.config.lines_to_exclude: 
                 linestyle = ":"
             else:
                 linestyle = "-"
             line, = ax.plot(arc_x, arc_y, 'b-', picker=2, linestyle=linestyle)
             utils.plot_oriented_triangle((arc_x[-1], arc_y[-1]), self.angle1+90, "blue", ax=ax)
             line.parent = self
-            if SHOW_LABELS:
-                ax.text(arc_x[len(arc_x)//2], arc_y[len(arc_y)//2], self.id, color='blue', va='center', fontsize=FONT_SIZE)
+            if self.config.show_labels:
+                ax.text(arc_x[len(arc_x)//2], arc_y[len(arc_y)//2], self.id, color='blue', va='center', fontsize=self.config.font_size)
             ax.plot(self.x0, self.y0, 'k+')  # center
         
             ## Optionally: Plot start and end of circular arc
@@ -177,9 +190,15 @@ class CircularArcAED:
 
 
 class HermiteSplineAED:
-    def __init__(self, x0, y0, angle0, x1, y1, angle1, id="", parent=None):
+    POINT_ATTRIBUTES = (("x0", "y0"), ("x1", "y1"))  # see draw.store.GeometryStore.apply_transforms
+    ANGLE_ATTRIBUTES = ("angle0", "angle1")
+    config = DEFAULT_CONFIG  # see config.Config, set per object to use other settings
+
+    def __init__(self, x0, y0, angle0, x1, y1, angle1, id="", parent=None, config=None):
         self.id = id 
         self.parent = parent
+        if config is not None:
+            self.config = config
         self.connection0 = None
         self.connection1 = None
         self.x0 = x0
@@ -224,54 +243,27 @@ class HermiteSplineAED:
         self.angle1 = -self.angle1
         return self
 
+    def polyline(self, tolerance=None):
+        """ The spline sampled within tolerance (default: config.tolerance), (points x 2). Only 
+        needed for drawing."""
+        p0, p1 = (self.x0, self.y0), (self.x1, self.y1)
+        num_points = int(utils.hermite_sample_count(p0, self.angle0, p1, self.angle1, tolerance or self.config.tolerance,
+                                                    self.config.max_points, self.config.num_points)[0])
+        return utils.hermite_curves(p0, self.angle0, p1, self.angle1, num_points)[0]
+
     def calculate(self, ax=None):
-        tangent_scale=1  # we assume this to be 1 (TODO: maybe clarify if this is correct)
-        # Convert angles to radians if not already
-        theta0 = utils.convert_angle(self.angle0, to="radians")
-        theta1 = utils.convert_angle(self.angle1, to="radians")
-
-        # Compute distance between points
-        dx = self.x1 - self.x0
-        dy = self.y1 - self.y0
-        distance = np.hypot(dx, dy)
-        tangent_length = tangent_scale * distance
-
-        # Compute tangent vectors from angles and scaled magnitude
-        T0 = tangent_length * np.array([np.cos(theta0), np.sin(theta0)])
-        T1 = tangent_length * np.array([np.cos(theta1), np.sin(theta1)])
-
-        # Hermite basis functions
-        def hermite(t):
-            h00 = 2*t**3 - 3*t**2 + 1
-            h10 = t**3 - 2*t**2 + t
-            h01 = -2*t**3 + 3*t**2
-            h11 = t**3 - t**2
-            return h00, h10, h01, h11
-
-        # Generate the spline points
-        t_values = np.linspace(0, 1, NUM_POINTS)
-        curve = []
-        for t in t_values:
-            h00, h10, h01, h11 = hermite(t)
-            point = (h00 * np.array([self.x0, self.y0]) +
-                    h10 * T0 +
-                    h01 * np.array([self.x1, self.y1]) +
-                    h11 * T1)
-            curve.append(point)
-
-        curve = np.array(curve)
-
-        # Plotting
+        # Plotting. The sampled points are only needed for drawing (see polyline())
         if ax:
-            if self.id in LINES_TO_EXCLUDE: 
+            curve = self.polyline()
+            if self.id in self.config.lines_to_exclude: 
                 linestyle = ":"
             else:
                 linestyle = "-"
             line, = ax.plot(curve[:, 0], curve[:, 1], color='purple', picker=2, linestyle=linestyle)
             utils.plot_oriented_triangle((self.x1, self.y1), self.angle1, "purple", ax=ax)
             line.parent = self
-            if SHOW_LABELS:
-                ax.text(curve[len(curve)//2][0], curve[len(curve)//2][1], self.id, color='purple', va='center', fontsize=FONT_SIZE)
+            if self.config.show_labels:
+                ax.text(curve[len(curve)//2][0], curve[len(curve)//2][1], self.id, color='purple', va='center', fontsize=self.config.font_size)
             # ax.plot([x0, x1], [y0, y1], 'ro--', label='Endpoints')
             # ax.quiver(x0, y0, T0[0], T0[1], angles='xy', scale_units='xy', scale=1, color='green')  # label='Start Tangent'
             # ax.quiver(x1, y1, T1[0], T1[1], angles='xy', scale_units='xy', scale=1, color='purple') # label='End Tangent'
@@ -280,6 +272,8 @@ class HermiteSplineAED:
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
 
     x0 = -38.0111
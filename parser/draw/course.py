@@ -1,25 +1,13 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import math
 import export.utils
-import misc
+from config import DEFAULT as DEFAULT_CONFIG
 
 try:
     from draw import utils
 except:
     import utils
 
-NUM_POINTS = 100
-SHOW_LABELS = True
-FONT_SIZE = 7
-
-EXCLUDE_FILE = "parser/res/json/exclude03.json"
-LINES_TO_EXCLUDE = misc.read_json(EXCLUDE_FILE)
-
-# Lane#0 will be at 0, LANE_POSITIONS[0], Lane#1 will be LANE_POSITIONS[1] meters from Lane#0, 
-# Lane#2 will be LANE_POSITIONS[2] meters from Lane#0, ...
-LANE_POSITIONS = [0] 
-
 
 class Course:
     def __init__(self, id=""):
@@ -40,9 +28,15 @@ class StraightCourse:
             self.angle1 = angle1
             self.parent = parent
 
-    def __init__(self, length, x0, y0, angle, id="", parent=None):
+    POINT_ATTRIBUTES = (("x0", "y0"), ("x1", "y1"))  # see draw.store.GeometryStore.apply_transforms
+    ANGLE_ATTRIBUTES = ("angle0", "angle1")
+    config = DEFAULT_CONFIG  # see config.Config, set per object to use other settings
+
+    def __init__(self, length, x0, y0, angle, id="", parent=None, config=None):
         self.id = id
         self.parent = parent
+        if config is not None:
+            self.config = config
         self.connection0 = None
         self.connection1 = None
         self.length = length
@@ -61,9 +55,10 @@ class StraightCourse:
             pts.append(export.utils.Point(lane.x1, lane.y1, lane.angle1, lane, 1))
         return pts
 
-    def add_or_update_lane(self, new_lane: Lane):
-        self.lanes = [lane for lane in self.lanes if lane.id != new_lane.id]  # remove old lane
-        self.lanes.append(new_lane)
+    def add_or_update_lanes(self, new_lanes: list[Lane]):
+        new_ids = {lane.id for lane in new_lanes}
+        self.lanes = [lane for lane in self.lanes if lane.id not in new_ids]  # remove old lanes
+        self.lanes.extend(new_lanes)
 
     def translate(self, offset):
         """Translate all points of the Straight by a given offset.
@@ -114,17 +109,18 @@ class StraightCourse:
             self.x1 = self.x0 + self.length * np.cos(angle_rad)
             self.y1 = self.y0 + self.length * np.sin(angle_rad)
         
-        if ax:
-            for l in range(len(LANE_POSITIONS)):
-                vector = utils.vector_from_points((self.x0, self.y0), (self.x1, self.y1))
-                x0, y0 = utils.translate_perpendicular((self.x0, self.y0), vector, -LANE_POSITIONS[l])
-                x1, y1 = utils.translate_perpendicular((self.x1, self.y1), vector, -LANE_POSITIONS[l])
-                lane_id = f"{self.id}-lane{l}"
-                lane = StraightCourse.Lane(l, lane_id, x0, y0, x1, y1, self.angle0, self.angle1, self)
-                self.add_or_update_lane(lane)
+        lanes = []
+        for l in range(len(self.config.lane_positions)):
+            vector = utils.vector_from_points((self.x0, self.y0), (self.x1, self.y1))
+            x0, y0 = utils.translate_perpendicular((self.x0, self.y0), vector, -self.config.lane_positions[l])
+            x1, y1 = utils.translate_perpendicular((self.x1, self.y1), vector, -self.config.lane_positions[l])
+            lane_id = f"{self.id}-lane{l}"
+            lane = StraightCourse.Lane(l, lane_id, x0, y0, x1, y1, self.angle0, self.angle1, self)
+            lanes.append(lane)
+            if ax:
                 line, = ax.plot([x0, x1], [y0, y1], color='green', picker=2)
                 line.parent = lane
-                if lane_id in LINES_TO_EXCLUDE: 
+                if lane_id in self.config.lines_to_exclude: 
                     linestyle = ":"
                 else:
                     linestyle = "-"
@@ -133,8 +129,10 @@ class StraightCourse:
                 # if self.id == "cp7":
                 #     ax.plot(self.x0, self.y0, marker='o', color='black', markersize=5)
                 #     ax.plot(self.x1, self.y1, marker='x', color='red', markersize=5)
-                if SHOW_LABELS:
-                    ax.text((self.x0+self.x1)//2, (self.y0+self.y1)//2, lane.id, color='blue', va='center', fontsize=FONT_SIZE)
+                if self.config.show_labels:
+                    ax.text((self.x0+self.x1)//2, (self.y0+self.y1)//2, lane.id, color='blue', va='center', fontsize=self.config.font_size)
+        self.add_or_update_lanes(lanes)
+        if ax:
             return line
         else:
             return self.x1, self.y1
@@ -154,9 +152,15 @@ class CurveCourse:
             self.radius = radius
             self.parent = parent
 
-    def __init__(self, length, radius, x0=0, y0=0, angle0=0, id="", parent=None):
+    POINT_ATTRIBUTES = (("x0", "y0"), ("x1", "y1"))  # see draw.store.GeometryStore.apply_transforms
+    ANGLE_ATTRIBUTES = ("angle0", "angle1")
+    config = DEFAULT_CONFIG  # see config.Config, set per object to use other settings
+
+    def __init__(self, length, radius, x0=0, y0=0, angle0=0, id="", parent=None, config=None):
         self.id = id
         self.parent = parent
+        if config is not None:
+            self.config = config
         self.connection0 = None
         self.connection1 = None
         self.length = length
@@ -171,20 +175,21 @@ class CurveCourse:
         self.y1 = None
         self.angle0 = angle0      # in degrees
         self.angle1 = None        # in degrees
+        self.cx = None            # center, set by calculate()
+        self.cy = None
         self.lanes = []
 
     def get_points(self):
         pts = []
         for lane in self.lanes:
-            if lane.lane_id in LINES_TO_EXCLUDE:
-                continue
             pts.append(export.utils.Point(lane.x0, lane.y0, lane.angle0, lane, 0))
             pts.append(export.utils.Point(lane.x1, lane.y1, lane.angle1, lane, 1))
         return pts
 
-    def add_or_update_lane(self, new_lane: Lane):
-        self.lanes = [lane for lane in self.lanes if lane.id != new_lane.id]  # remove old lane
-        self.lanes.append(new_lane)
+    def add_or_update_lanes(self, new_lanes: list[Lane]):
+        new_ids = {lane.id for lane in new_lanes}
+        self.lanes = [lane for lane in self.lanes if lane.id not in new_ids]  # remove old lanes
+        self.lanes.extend(new_lanes)
 
     def translate(self, offset):
         """Translate all points of the Straight by a given offset.
@@ -213,77 +218,107 @@ class CurveCourse:
         self.y1 = -self.y1
         self.angle0 = -self.angle0
         self.angle1 = -self.angle1
+        return self.mirror_direction()
+
+    def mirror_direction(self):
         if self.direction == "right":
             self.direction = "left"
         else: 
             self.direction = "right"
         return self
 
+    def _arc_angle_rad(self):
+        # Arc angle in radians: arc_length = radius * angle
+        arc_angle_rad = self.length / abs(self.radius)
+        if self.direction == 'right':
+            arc_angle_rad = -arc_angle_rad
+        return arc_angle_rad
+
+    def _lane_radii(self):
+        """ Offsetting a lane to the right of the driving direction moves it towards the center of a 
+        right curve and away from the center of a left curve."""
+        offsets = np.asarray(self.config.lane_positions, dtype=float)
+        r = abs(self.radius)
+        return r - offsets if self.direction == "right" else r + offsets
+
+    def _lane_arcs(self, thetas):
+        """ Points of all lanes at the turning angles thetas (rad, from the start), (lanes x thetas) each."""
+        start_angle_rad = np.radians(self.angle0)
+        if self.direction == "right":
+            phis = thetas + start_angle_rad + np.pi/2
+        else:
+            phis = thetas - (np.pi/2 - start_angle_rad)
+        radii = self._lane_radii()
+        return self.cx + radii[:, None] * np.cos(phis), self.cy + radii[:, None] * np.sin(phis)
+
+    def lane_polylines(self, tolerance=None):
+        """ All lanes sampled within tolerance (default: config.tolerance), (lanes x points x 2). Only 
+        needed for drawing, calculate() has to be called before."""
+        arc_angle_rad = self._arc_angle_rad()
+        # enough points for the outermost lane
+        outer_radius = abs(self.radius) + max(np.abs(self.config.lane_positions))
+        num_points = int(utils.arc_sample_count(outer_radius, arc_angle_rad, tolerance or self.config.tolerance,
+                                                self.config.max_points, self.config.num_points))
+        arcs_x, arcs_y = self._lane_arcs(np.linspace(0, arc_angle_rad, num_points))
+        return np.stack([arcs_x, arcs_y], axis=2)
+
     def calculate(self, ax=None):
         """
         Draws a circular arc with a given length and radius.
         - direction: 'right' or 'left'
         - start_angle_deg: initial heading angle in degrees (0 = pointing right)
         Returns the end (x, y) and new heading angle.
+
+        Every lane is a concentric arc: offsetting a lane to the right of the driving direction 
+        moves it towards the center of a right curve (radius r - offset) and away from the center 
+        of a left curve (radius r + offset). All lanes are computed in one NumPy batch.
+
+        Only the end points are computed here (in closed form), see lane_polylines() for drawing.
         """
-        for l in range(len(LANE_POSITIONS)):
-            # Arc angle in radians: arc_length = radius * angle
-            r = abs(self.radius)
-            arc_angle_rad = self.length / r
-            if self.direction == 'right':
-                arc_angle_rad = -arc_angle_rad
-
-            # Generate theta values
-            thetas = np.linspace(0, arc_angle_rad, NUM_POINTS)
-
-            # Start angle in radians
-            start_angle_rad = np.radians(self.angle0)
-            if l == 0:  # We want to store the values of the first lane
-                self.angle1 = self.angle0 + np.degrees(arc_angle_rad)
-
-            if self.direction == "right":
-                cx = self.x0 - math.cos(np.pi/2 + start_angle_rad) * r
-                cy = self.y0 - math.sin(np.pi/2 + start_angle_rad) * r
-                arc_x = cx + abs(r) * np.cos(thetas + start_angle_rad + np.pi/2)
-                arc_y = cy + abs(r) * np.sin(thetas + start_angle_rad + np.pi/2)
-            else:
-                cx = self.x0 + math.cos(np.pi/2 + start_angle_rad) * r
-                cy = self.y0 + math.sin(np.pi/2 + start_angle_rad) * r
-                arc_x = cx + abs(r) * np.cos(thetas - (np.pi/2 - start_angle_rad))
-                arc_y = cy + abs(r) * np.sin(thetas - (np.pi/2 - start_angle_rad))
-            
-            for p in range(len(arc_x)):
-                x = arc_x[p]
-                y = arc_y[p]
-                try: 
-                    x_n = arc_x[p+1]
-                    y_n = arc_y[p+1]
-                    vector = utils.vector_from_points((x, y), (x_n, y_n))
-                except:
-                    vector = utils.vector_from_angle(utils.convert_angle(self.angle1, to='radians'))
-                arc_x[p], arc_y[p] = utils.translate_perpendicular((x, y), vector, -LANE_POSITIONS[l])
-
-            # Return final position and angle
-            if l == 0:  # We want to store the values of the first lane
-                self.x1 = arc_x[-1]
-                self.y1 = arc_y[-1]
+        r = abs(self.radius)
+        arc_angle_rad = self._arc_angle_rad()
+        self.angle1 = self.angle0 + np.degrees(arc_angle_rad)
 
-            if ax:
-                current_radius = utils.euclidean_distance((cx, cy), (arc_x[0], arc_y[0]))
-                lane_id = f"{self.id}-lane{l}"
-                lane = CurveCourse.Lane(l, lane_id, arc_x[0], arc_y[0], arc_x[-1], 
-                                        arc_y[-1], self.angle0, self.angle1, current_radius, self)
-                self.add_or_update_lane(lane)
-                ax.plot(cx, cy, marker='o', color='red', markersize=1)
-                if lane_id in LINES_TO_EXCLUDE: 
+        # Start angle in radians
+        start_angle_rad = np.radians(self.angle0)
+        if self.direction == "right":
+            self.cx = self.x0 - math.cos(np.pi/2 + start_angle_rad) * r
+            self.cy = self.y0 - math.sin(np.pi/2 + start_angle_rad) * r
+        else:
+            self.cx = self.x0 + math.cos(np.pi/2 + start_angle_rad) * r
+            self.cy = self.y0 + math.sin(np.pi/2 + start_angle_rad) * r
+
+        # Only start and end of every lane in closed form, the arcs are sampled for drawing only 
+        # (see lane_polylines()). (lanes x 2)
+        ends_x, ends_y = self._lane_arcs(np.array([0, arc_angle_rad]))
+
+        # Return final position and angle (of the first lane)
+        self.x1 = ends_x[0, -1]
+        self.y1 = ends_y[0, -1]
+
+        radii = self._lane_radii()
+        lanes = []
+        for l in range(len(radii)):
+            lane_id = f"{self.id}-lane{l}"
+            lane = CurveCourse.Lane(l, lane_id, ends_x[l, 0], ends_y[l, 0], ends_x[l, -1], 
+                                    ends_y[l, -1], self.angle0, self.angle1, abs(radii[l]), self)
+            lanes.append(lane)
+        self.add_or_update_lanes(lanes)
+
+        if ax:
+            arcs = self.lane_polylines()
+            for lane in self.lanes:
+                arc_x, arc_y = arcs[int(lane.lane_id), :, 0], arcs[int(lane.lane_id), :, 1]
+                ax.plot(self.cx, self.cy, marker='o', color='red', markersize=1)
+                if lane.id in self.config.lines_to_exclude: 
                     linestyle = ":"
                 else:
                     linestyle = "-"
                 line, = ax.plot(arc_x, arc_y, color='red', picker=2, linestyle=linestyle)
                 utils.plot_oriented_triangle((arc_x[-1], arc_y[-1]), self.angle1, "red", ax=ax)
                 line.parent = lane
-                if SHOW_LABELS:
-                    ax.text(arc_x[len(arc_x)//2], arc_y[len(arc_y)//2], lane.id, color='blue', va='center', fontsize=FONT_SIZE)
+                if self.config.show_labels:
+                    ax.text(arc_x[len(arc_x)//2], arc_y[len(arc_y)//2], lane.id, color='blue', va='center', fontsize=self.config.font_size)
         if ax:
             return line
         else:
@@ -291,9 +326,15 @@ class CurveCourse:
 
 
 class BezierCourse:
-    def __init__(self, x0, y0, angle0, x1, y1, angle1, id="", parent=None):
+    POINT_ATTRIBUTES = (("x0", "y0"), ("x1", "y1"))  # see draw.store.GeometryStore.apply_transforms
+    ANGLE_ATTRIBUTES = ("angle0", "angle1")
+    config = DEFAULT_CONFIG  # see config.Config, set per object to use other settings
+
+    def __init__(self, x0, y0, angle0, x1, y1, angle1, id="", parent=None, config=None):
         self.id = id 
         self.parent = parent
+        if config is not None:
+            self.config = config
         self.connection0 = None
         self.connection1 = None
         self.x0 = x0
@@ -341,55 +382,28 @@ class BezierCourse:
         self.angle1 = -self.angle1
         return self
 
+    def polyline(self, tolerance=None):
+        """ The Bezier sampled within tolerance (default: config.tolerance), (points x 2). Only 
+        needed for drawing."""
+        p0, p1 = (self.x0, self.y0), (self.x1, self.y1)
+        num_points = int(utils.hermite_sample_count(p0, self.angle0, p1, self.angle1, tolerance or self.config.tolerance,
+                                                    self.config.max_points, self.config.num_points)[0])
+        return utils.hermite_curves(p0, self.angle0, p1, self.angle1, num_points)[0]
+
     def calculate(self, ax=None):
-        tangent_scale=1  # we assume this to be 1 (TODO: maybe clarify if this is correct)
-        # Convert angles to radians if not already
-        theta0 = utils.convert_angle(self.angle0, to="radians")
-        theta1 = utils.convert_angle(self.angle1, to="radians")
-
-        # Compute distance between points
-        dx = self.x1 - self.x0
-        dy = self.y1 - self.y0
-        distance = np.hypot(dx, dy)
-        tangent_length = tangent_scale * distance
-
-        # Compute tangent vectors from angles and scaled magnitude
-        T0 = tangent_length * np.array([np.cos(theta0), np.sin(theta0)])
-        T1 = tangent_length * np.array([np.cos(theta1), np.sin(theta1)])
-
-        # Hermite basis functions
-        def hermite(t):
-            h00 = 2*t**3 - 3*t**2 + 1
-            h10 = t**3 - 2*t**2 + t
-            h01 = -2*t**3 + 3*t**2
-            h11 = t**3 - t**2
-            return h00, h10, h01, h11
-
-        # Generate the spline points
-        t_values = np.linspace(0, 1, NUM_POINTS)
-        curve = []
-        for t in t_values:
-            h00, h10, h01, h11 = hermite(t)
-            point = (h00 * np.array([self.x0, self.y0]) +
-                    h10 * T0 +
-                    h01 * np.array([self.x1, self.y1]) +
-                    h11 * T1)
-            curve.append(point)
-
-        curve = np.array(curve)
-
-        # Plotting
-        # TODO: Impement LANE_POSITIONS 
+        # Plotting. The sampled points are only needed for drawing (see polyline())
+        # TODO: Impement lane_positions 
         if ax:
-            if self.id in LINES_TO_EXCLUDE: 
+            curve = self.polyline()
+            if self.id in self.config.lines_to_exclude: 
                 linestyle = ":"
             else:
                 linestyle = "-"
             line, = ax.plot(curve[:, 0], curve[:, 1], color='black', picker=2, linestyle=linestyle)
             utils.plot_oriented_triangle((self.x1, self.y1), self.angle1, "purple", ax=ax)
             line.parent = self
-            if SHOW_LABELS:
-                ax.text(curve[len(curve)//2][0], curve[len(curve)//2][1], self.id, color='purple', va='center', fontsize=FONT_SIZE)
+            if self.config.show_labels:
+                ax.text(curve[len(curve)//2][0], curve[len(curve)//2][1], self.id, color='purple', va='center', fontsize=self.config.font_size)
             # ax.plot([x0, x1], [y0, y1], 'ro--', label='Endpoints')
             # ax.quiver(x0, y0, T0[0], T0[1], angles='xy', scale_units='xy', scale=1, color='green')  # label='Start Tangent'
             # ax.quiver(x1, y1, T1[0], T1[1], angles='xy', scale_units='xy', scale=1, color='purple') # label='End Tangent'
@@ -401,6 +415,8 @@ class BezierCourse:
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     roads = [
         # id   # type  # parameters from silab
         ["cp1", "Straight", 100],
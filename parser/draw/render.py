@@ -0,0 +1,278 @@
+import numpy as np
+from matplotlib.collections import LineCollection, PathCollection, PolyCollection
+from matplotlib.lines import Line2D
+from matplotlib.text import TextPath
+from matplotlib.transforms import Affine2D
+
+from draw import utils
+from draw.aed import StraightAED, CircularArcAED, HermiteSplineAED
+from draw.course import StraightCourse, CurveCourse, BezierCourse
+
+
+class LabelCollection(PathCollection):
+    """ Many text labels as one artist: every label is a TextPath (sized in points, vertically 
+    centered) placed at its position in data coordinates, like the markers of a scatter plot. All 
+    labels are drawn with a single draw_path_collection call instead of one Text artist each."""
+    def __init__(self, ax, font_size):
+        super().__init__([], offsets=np.zeros((0, 2)), offset_transform=ax.transData, linewidths=0)
+        self.font_size = font_size
+        self._text_paths = {}
+
+    def text_path(self, text):
+        if text not in self._text_paths:
+            path = TextPath((0, 0), text, size=self.font_size)
+            y = path.vertices[:, 1]  # control points, close enough to center a label (get_extents() is slow)
+            offset = -(y.min() + y.max()) / 2 if len(y) else 0
+            self._text_paths[text] = path.transformed(Affine2D().translate(0, offset))
+        return self._text_paths[text]
+
+    def set_labels(self, positions, texts, colors):
+        self.set_paths([self.text_path(text) for text in texts])
+        self.set_offsets(np.asarray(positions, dtype=float).reshape(-1, 2))
+        self.set_facecolor(colors)
+
+    def draw(self, renderer):
+        self.set_transform(Affine2D().scale(self.figure.dpi / 72))  # points -> pixels
+        super().draw(renderer)
+
+
+class BoxIndex:
+    """ Uniform grid over bounding boxes: every cell lists the boxes which overlap it, so a query 
+    only tests the boxes of the cells it touches.
+
+    Parameters:
+        boxes: (n x 4) xmin, ymin, xmax, ymax (rows with NaN are never returned)
+        cells: amount of cells along the longer side of the map
+    """
+    def __init__(self, boxes, cells=32):
+        self.boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        valid = ~np.isnan(self.boxes).any(axis=1)
+        self.valid = np.flatnonzero(valid)
+        if not len(self.valid):
+            self.origin, self.cell_size, self.cells = np.zeros(2), 1.0, {}
+            return
+        self.origin = self.boxes[valid, :2].min(axis=0)
+        extent = self.boxes[valid, 2:].max(axis=0) - self.origin
+        self.cell_size = max(extent.max() / cells, 1e-9)
+        cell_ranges = self._cells(self.boxes[valid])
+        lists = {}
+        for i, (i0, j0, i1, j1) in zip(self.valid.tolist(), cell_ranges.tolist()):
+            for ci in range(i0, i1 + 1):
+                for cj in range(j0, j1 + 1):
+                    lists.setdefault((ci, cj), []).append(i)
+        self.cells = {cell: np.array(items) for cell, items in lists.items()}
+
+    def _cells(self, boxes):
+        return np.floor((boxes - np.tile(self.origin, 2)) / self.cell_size).astype(int)
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """ Sorted indices of all boxes overlapping the given box."""
+        i0, j0, i1, j1 = self._cells(np.array([xmin, ymin, xmax, ymax]))
+        if (i1 - i0 + 1) * (j1 - j0 + 1) >= len(self.cells):
+            candidates = self.valid  # (nearly) everything is in view, testing all boxes is faster
+        else:
+            found = [self.cells[(ci, cj)] for ci in range(i0, i1 + 1) for cj in range(j0, j1 + 1)
+                     if (ci, cj) in self.cells]
+            candidates = np.unique(np.concatenate(found)) if found else self.valid[:0]
+        boxes = self.boxes[candidates]
+        overlap = (boxes[:, 0] <= xmax) & (boxes[:, 2] >= xmin) & (boxes[:, 1] <= ymax) & (boxes[:, 3] >= ymin)
+        return candidates[overlap]
+
+
+class MapRenderer:
+    """ Draws all rows of a GeometryStore with a few collections instead of one artist per segment.
+
+    All lines of one class are one LineCollection, all direction arrows one PolyCollection and all
+    labels one LabelCollection. The collections only hold the rows which are currently shown, 
+    row_of() maps a picked index back to the row of the store.
+
+    Whenever the axes limits change, the collections are updated for the new view (level of detail):
+    - rows outside of the view are skipped (found with a BoxIndex over their bounding boxes)
+    - curves are sampled only as fine as one pixel needs (never finer than config.tolerance); 
+      every level is sampled once, on demand, and only for the rows in view
+    - labels and arrows are only drawn when zoomed in to config.detail_scale meters per pixel
+
+    Parameters:
+        ax: matplotlib Axes
+        store: draw.store.GeometryStore of a built scenario
+        config: config.Config (lines_to_exclude, show_labels, font_size, detail_scale, tolerance)
+    """
+    # class: (line color, arrow color, label color)
+    STYLES = {
+        StraightAED: ("blue", "blue", "blue"),
+        CircularArcAED: ("blue", "blue", "blue"),
+        HermiteSplineAED: ("purple", "purple", "purple"),
+        StraightCourse.Lane: ("green", "green", "blue"),
+        CurveCourse.Lane: ("red", "red", "blue"),
+        BezierCourse: ("black", "purple", "purple"),
+    }
+    ARROW = np.array([[0, 0], [-0.5, -1], [0.5, -1]]) * 3.0  # see utils.plot_oriented_triangle
+    PICK_RADIUS = 2
+    VIEW_MARGIN = 0.1  # rows this far (relative to the view size) outside of the view are kept
+
+    def __init__(self, ax, store, config=None):
+        self.ax = ax
+        self.store = store
+        self.config = config if config is not None else store.config
+        self.rows = store.rows_of(*self.STYLES)
+        self.hidden = set()
+        self._polylines = {}  # tolerance -> row -> points
+        self._highlight = None
+        self._highlight_row = None
+        self._view = None
+
+        c = store.columns
+        types = c["type"][self.rows]
+        self.classes = [store.CLASSES[t] for t in types.tolist()]
+        boxes = store.bounding_boxes()[self.rows]
+        self.index = BoxIndex(boxes)
+        # arrows at the end of every line, CircularArcAED angles are seen from the center
+        headings = np.where(types == store.CLASSES.index(CircularArcAED), c["angle1"][self.rows] + 90, c["angle1"][self.rows])
+        ends = np.column_stack([c["x1"][self.rows], c["y1"][self.rows]])
+        theta = np.radians(headings - 90)
+        rotation = np.stack([np.stack([np.cos(theta), -np.sin(theta)], axis=1),
+                             np.stack([np.sin(theta), np.cos(theta)], axis=1)], axis=1)  # (n x 2 x 2)
+        self.arrows = np.einsum("nij,kj->nki", rotation, self.ARROW) + ends[:, None, :]
+        # labels in the middle of every line
+        self.label_positions = store.midpoints()[self.rows]
+
+        self.collections = {}
+        for cls, (color, _, _) in self.STYLES.items():
+            collection = LineCollection([], colors=color, picker=self.PICK_RADIUS)
+            self.collections[cls] = collection
+            ax.add_collection(collection)
+        self.arrow_collection = PolyCollection([], closed=True)
+        ax.add_collection(self.arrow_collection)
+        self.label_collection = LabelCollection(ax, self.config.font_size)
+        self.label_collection.set_visible(self.config.show_labels)
+        ax.add_collection(self.label_collection, autolim=False)
+        # markers: start of every circular arc, center of every curve
+        arc_rows = store.rows_of(CircularArcAED)
+        curve_rows = store.rows_of(CurveCourse)
+        ax.plot(c["x0"][arc_rows], c["y0"][arc_rows], 'k+', linestyle="none")
+        ax.plot(c["cx"][curve_rows], c["cy"][curve_rows], marker='o', color='red', markersize=1, linestyle="none")
+        # the collections start empty, so the data limits are given explicitly
+        ax.update_datalim(np.concatenate([boxes[:, :2], boxes[:, 2:], self.arrows.reshape(-1, 2)]))
+        ax.autoscale_view()
+        self.update()
+        ax.callbacks.connect("xlim_changed", self.on_view_changed)
+        ax.callbacks.connect("ylim_changed", self.on_view_changed)
+        ax.figure.canvas.mpl_connect("resize_event", self.on_view_changed)
+        utils.blit_manager(ax.figure)  # caches the background from the first draw on, see highlight()
+        self.config.lines_to_exclude.listeners.append(self.on_exclusion_changed)
+
+    def redraw(self):
+        self.update()
+        self.ax.figure.canvas.draw_idle()
+
+    def on_view_changed(self, _):
+        # panning changes x and y limits one after the other, only update if the view changed
+        if self._view != self.view():
+            self.update()
+
+    def view(self):
+        """ Limits of the axes (xmin, ymin, xmax, ymax) and meters per pixel."""
+        (x0, y0), (x1, y1) = self.ax.viewLim.get_points()
+        width = max(self.ax.bbox.width, 1)
+        return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)), abs(x1 - x0) / width
+
+    def tolerance(self, scale):
+        """ Sampling tolerance for a scale (meters per pixel): config.tolerance times a power of 2, so 
+        only a few levels are ever sampled."""
+        tolerance = self.config.tolerance
+        if scale / 2 <= tolerance:
+            return tolerance
+        return tolerance * 2 ** int(np.floor(np.log2(scale / 2 / tolerance)))
+
+    def polylines(self, rows, tolerance=None):
+        """ Polylines of rows within tolerance (default: config.tolerance), sampled once, on demand."""
+        cache = self._polylines.setdefault(tolerance or self.config.tolerance, {})
+        missing = [row for row in rows if row not in cache]
+        if missing:
+            cache.update(self.store.polylines(missing, tolerance))
+        return [cache[row] for row in rows]
+
+    def shown(self):
+        """ Indices (into self.rows) of all rows in view which are not hidden."""
+        (xmin, ymin, xmax, ymax), _ = self.view()
+        margin_x, margin_y = (xmax - xmin) * self.VIEW_MARGIN, (ymax - ymin) * self.VIEW_MARGIN
+        in_view = self.index.query(xmin - margin_x, ymin - margin_y, xmax + margin_x, ymax + margin_y)
+        return [i for i in in_view.tolist() if int(self.rows[i]) not in self.hidden]
+
+    def linestyle(self, row):
+        return ":" if self.store.ids[row] in self.config.lines_to_exclude else "-"
+
+    def update(self):
+        """ Writes the shown rows into the collections, for the current view."""
+        self._view = self.view()
+        _, scale = self._view
+        shown = self.shown()
+        tolerance = self.tolerance(scale)
+        self._shown_rows = {cls: [] for cls in self.collections}
+        for i in shown:
+            self._shown_rows[self.classes[i]].append(int(self.rows[i]))
+        for cls, collection in self.collections.items():
+            rows = self._shown_rows[cls]
+            collection.set_segments(self.polylines(rows, tolerance))
+            collection.set_linestyles([self.linestyle(row) for row in rows] or "-")
+        detail = shown if scale <= self.config.detail_scale else []
+        self.arrow_collection.set_verts(self.arrows[detail])
+        self.arrow_collection.set_facecolor([self.STYLES[self.classes[i]][1] for i in detail])
+        self.arrow_collection.set_edgecolor([self.STYLES[self.classes[i]][1] for i in detail])
+        self.label_collection.set_labels(self.label_positions[detail], [self.store.ids[self.rows[i]] for i in detail],
+                                         [self.STYLES[self.classes[i]][2] for i in detail])
+
+    def on_exclusion_changed(self, id):
+        """ Restyles the lines of id (dotted if excluded), nothing else is updated."""
+        for cls, rows in self._shown_rows.items():
+            if any(self.store.ids[row] == id for row in rows):
+                self.collections[cls].set_linestyles([self.linestyle(row) for row in rows] or "-")
+        if self._highlight is not None and self.store.ids[self._highlight_row] == id:
+            self._highlight.set_linestyle(self.linestyle(self._highlight_row))
+        self.ax.figure.canvas.draw_idle()
+
+    def names(self):
+        """ Name of every drawn row, e.g. for a legend (see set_visible)."""
+        store = self.store
+        names = []
+        for row, cls in zip(self.rows.tolist(), self.classes):
+            owner = store.columns["owner"][row]
+            cls = store.CLASSES[store.columns["type"][owner]] if owner >= 0 else cls
+            names.append(f"{store.ids[row]} {cls.__name__[:5]}")
+        return names
+
+    def set_visible(self, row, visible):
+        if visible:
+            self.hidden.discard(row)
+        else:
+            self.hidden.add(row)
+        self.redraw()
+
+    def row_of(self, collection, index):
+        """ Row of the store drawn as segment index of collection."""
+        for cls, candidate in self.collections.items():
+            if candidate is collection:
+                return self._shown_rows[cls][index]
+        return None
+
+    def picked_rows(self, event):
+        """ Rows of the store hit by a pick_event (empty if it was not one of the collections)."""
+        rows = [self.row_of(event.artist, int(index)) for index in getattr(event, "ind", [])]
+        return [row for row in rows if row is not None]
+
+    def highlight(self, row):
+        """ Draws row (thicker) on top of the map, replaces the previous highlight. Returns the Line2D,
+        which is animated: it is only drawn by the figure's BlitManager (see utils.blink_line)."""
+        manager = utils.blit_manager(self.ax.figure)
+        if self._highlight is not None:
+            manager.remove_artist(self._highlight)
+            self._highlight.remove()
+        cls = self.store.CLASSES[self.store.columns["type"][row]]
+        points, = self.polylines([row])
+        self._highlight = Line2D(points[:, 0], points[:, 1], color=self.STYLES[cls][0], linewidth=3,
+                                 linestyle=self.linestyle(row))
+        self._highlight_row = row
+        manager.add_artist(self._highlight)
+        self.ax.add_line(self._highlight)
+        manager.update()
+        return self._highlight
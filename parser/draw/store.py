@@ -0,0 +1,382 @@
+import numpy as np
+
+from config import DEFAULT as DEFAULT_CONFIG
+from draw.aed import Area2, StraightAED, CircularArcAED, HermiteSplineAED
+from draw.course import Course, StraightCourse, CurveCourse, BezierCourse
+from draw.transform import stack_transforms, transform_points
+from draw import utils
+
+
+class GeometryStore:
+    """ All segments of a map (and the lanes of the Courses) as NumPy columns, one row each.
+
+    The rows 0 .. n-1 are the segments in the order they were given, followed by the lanes. For the
+    existing code every row has a view object (see make_view_class): an instance of the original
+    class (e.g. isinstance(view, StraightAED)), whose attributes are read from and written to the
+    columns, so calculate(), get_points(), the exporter etc. work unchanged. Whole-map operations
+    (apply_transforms, endpoints, arc_lengths, bounding_boxes, midpoints, sample_splines) work on the columns 
+    directly; polylines are only sampled on demand (polylines()).
+
+    Columns:
+        type: index into CLASSES
+        module: index into modules (-1 for lanes)
+        owner: row of the segment a lane belongs to (-1 for segments)
+        lane: lane_id of lanes (-1 for segments)
+        direction: see DIRECTIONS
+        x0, y0, x1, y1, angle0, angle1, radius, cx, cy, length: as the attributes of the classes,
+            NaN where the attribute is None or not defined
+        offset: lateral position of a lane (config.lane_positions), 0 for segments
+    """
+    CLASSES = (StraightAED, CircularArcAED, HermiteSplineAED, StraightCourse, CurveCourse, BezierCourse,
+               StraightCourse.Lane, CurveCourse.Lane)
+    MODULE_CLASSES = (Course, Area2)
+    SPLINE_CLASSES = (HermiteSplineAED, BezierCourse)
+    FLOAT_COLUMNS = ("x0", "y0", "x1", "y1", "angle0", "angle1", "radius", "cx", "cy", "length", "offset")
+    INT_COLUMNS = {"type": np.int8, "module": np.int32, "owner": np.int32, "lane": np.int32, "direction": np.int8}
+    ATTRIBUTE_COLUMNS = {"r": "radius", "lane_id": "lane"}  # attribute names which differ from the column
+    DIRECTIONS = {None: 0, "right": 1, "left": -1}
+
+    def __init__(self, columns, ids, modules, config=None):
+        self.columns = columns
+        self.ids = ids
+        self.modules = modules
+        self.config = config if config is not None else DEFAULT_CONFIG
+        self.links = {}  # (row, anchor) -> connection0 / connection1 (only set by build.create_connection)
+        self._lane_rows = {}
+        for row in np.flatnonzero(columns["owner"] >= 0).tolist():
+            self._lane_rows.setdefault(int(columns["owner"][row]), []).append(row)
+        self.views = [VIEW_CLASSES[t](self, row) for row, t in enumerate(columns["type"].tolist())]
+        self.amount_segments = int(np.count_nonzero(columns["owner"] < 0))
+        for module in modules:
+            module.parts = []
+        for view in self.objects:
+            view.parent.parts.append(view)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def objects(self):
+        """ Views of all segments, in the order given to from_objects."""
+        return self.views[:self.amount_segments]
+
+    @classmethod
+    def from_objects(cls, objects, config=None):
+        """ Copies objects (and their lanes) into a new store. Use store.objects instead of them afterwards."""
+        modules, module_index = [], {}
+        for obj in objects:
+            if id(obj.parent) not in module_index:
+                module_index[id(obj.parent)] = len(modules)
+                modules.append(obj.parent)
+        lanes = [(row, lane) for row, obj in enumerate(objects) for lane in getattr(obj, "lanes", [])]
+        items = list(objects) + [lane for _, lane in lanes]
+        type_codes = {c: i for i, c in enumerate(cls.CLASSES)}
+        if config is None and objects:
+            config = objects[0].config
+
+        columns = {name: np.full(len(items), np.nan) for name in cls.FLOAT_COLUMNS}
+        columns.update({name: np.full(len(items), -1, dtype=dtype) for name, dtype in cls.INT_COLUMNS.items()})
+        columns["offset"][:] = 0
+        columns["direction"][:] = 0
+        for row, item in enumerate(items):
+            columns["type"][row] = type_codes[type(item)]
+            for name, value in vars(item).items():
+                column = cls.ATTRIBUTE_COLUMNS.get(name, name)
+                if column in cls.FLOAT_COLUMNS and value is not None:
+                    columns[column][row] = value
+            if hasattr(item, "direction"):
+                columns["direction"][row] = cls.DIRECTIONS[item.direction]
+        for row, obj in enumerate(objects):
+            columns["module"][row] = module_index[id(obj.parent)]
+        lane_positions = (config or DEFAULT_CONFIG).lane_positions
+        for row, (owner, lane) in enumerate(lanes, start=len(objects)):
+            lane_id = int(lane.lane_id)  # may be a float, if restored by build.objects_from_arrays
+            columns["owner"][row] = owner
+            columns["lane"][row] = lane_id
+            columns["offset"][row] = lane_positions[lane_id] if lane_id < len(lane_positions) else 0
+        return cls(columns, [item.id for item in items], modules, config)
+
+    def to_arrays(self):
+        arrays = {f"column_{name}": column for name, column in self.columns.items()}
+        arrays["ids"] = np.array(self.ids, dtype=str)
+        arrays["module_classes"] = np.array([type(m).__name__ for m in self.modules], dtype=str)
+        arrays["module_ids"] = np.array([m.id for m in self.modules], dtype=str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, data, config=None):
+        """ Restores a store written by to_arrays."""
+        module_classes = {c.__name__: c for c in cls.MODULE_CLASSES}
+        modules = [module_classes[name](module_id) for name, module_id
+                   in zip(data["module_classes"].tolist(), data["module_ids"].tolist())]
+        columns = {name: np.array(data[f"column_{name}"]) for name in (*cls.FLOAT_COLUMNS, *cls.INT_COLUMNS)}
+        return cls(columns, data["ids"].tolist(), modules, config)
+
+    def lane_rows(self, row):
+        return self._lane_rows.get(row, [])
+
+    def add_lanes(self, owner, lanes):
+        """ Appends rows for lanes which did not exist when the store was created, growing every column once."""
+        start, count = len(self.ids), len(lanes)
+        for name, column in self.columns.items():
+            fill = np.full(count, np.nan if column.dtype.kind == "f" else -1, dtype=column.dtype)
+            self.columns[name] = np.concatenate([column, fill])
+        rows = list(range(start, start + count))
+        lane_positions = self.config.lane_positions
+        for row, lane in zip(rows, lanes):
+            self.ids.append(lane.id)
+            self.columns["type"][row] = self.CLASSES.index(type(lane))
+            self.columns["owner"][row] = owner
+            self.columns["direction"][row] = 0
+            self.columns["lane"][row] = lane.lane_id
+            self.columns["offset"][row] = lane_positions[lane.lane_id] if lane.lane_id < len(lane_positions) else 0
+            self.views.append(VIEW_CLASSES[self.columns["type"][row]](self, row))
+        self._lane_rows.setdefault(owner, []).extend(rows)
+        return rows
+
+    def nbytes(self):
+        """ Memory of the columns in bytes."""
+        return sum(column.nbytes for column in self.columns.values())
+
+    def apply_transforms(self, transforms):
+        """ Applies one Transform per row to all of its points and headings in one NumPy batch.
+
+        Every object class lists its coordinates in POINT_ATTRIBUTES (pairs of attribute names) and 
+        its headings in ANGLE_ATTRIBUTES; values which are not set yet (NaN) are skipped. Mirroring 
+        transformations also flip the direction of CurveCourses (see CurveCourse.mirror_direction).
+        """
+        t_index, matrices, angles, signs = stack_transforms(transforms)
+        rows = np.arange(self.amount_segments)
+        types = self.columns["type"][rows]
+        for x_name, y_name in (("x0", "y0"), ("x1", "y1"), ("cx", "cy")):
+            has_pair = np.array([(x_name, y_name) in getattr(c, "POINT_ATTRIBUTES", ()) for c in self.CLASSES])[types]
+            x, y = self.columns[x_name], self.columns[y_name]
+            selected = rows[has_pair & ~np.isnan(x[rows]) & ~np.isnan(y[rows])]
+            if len(selected):
+                points = transform_points(matrices[t_index[selected]], np.column_stack([x[selected], y[selected]]))
+                x[selected], y[selected] = points[:, 0], points[:, 1]
+        for name in ("angle0", "angle1"):
+            has_angle = np.array([name in getattr(c, "ANGLE_ATTRIBUTES", ()) for c in self.CLASSES])[types]
+            column = self.columns[name]
+            selected = rows[has_angle & ~np.isnan(column[rows])]
+            column[selected] = signs[t_index[selected]] * column[selected] + angles[t_index[selected]]
+        mirrored = rows[(signs[t_index] < 0) & (self.columns["direction"][rows] != 0)]
+        self.columns["direction"][mirrored] *= -1
+
+    def endpoints(self, rows=None):
+        """ Start and end points of rows (default: all) as arrays, like get_points() of every row.
+
+        Returns:
+            dict: x, y, angle, row, pos (0 = start, 1 = end), two entries per row
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        c = self.columns
+        return {
+            "x": np.column_stack([c["x0"][rows], c["x1"][rows]]).ravel(),
+            "y": np.column_stack([c["y0"][rows], c["y1"][rows]]).ravel(),
+            "angle": np.column_stack([c["angle0"][rows], c["angle1"][rows]]).ravel(),
+            "row": np.repeat(rows, 2),
+            "pos": np.tile([0, 1], len(rows)),
+        }
+
+    def rows_of(self, *classes):
+        """ Rows of all given classes (e.g. store.rows_of(CurveCourse.Lane))."""
+        return np.flatnonzero(np.isin(self.columns["type"], [self.CLASSES.index(c) for c in classes]))
+
+    def _arc_geometry(self, rows):
+        """ Center, radius, start angle seen from the center and signed sweep (rad) of arc rows. The 
+        lanes of a CurveCourse share the center of their owner."""
+        c = self.columns
+        owners = c["owner"][rows]
+        centers = np.where(owners >= 0, owners, rows)
+        cx, cy = c["cx"][centers], c["cy"][centers]
+        phi0 = np.arctan2(c["y0"][rows] - cy, c["x0"][rows] - cx)
+        radius = np.hypot(c["x0"][rows] - cx, c["y0"][rows] - cy)
+        sweep = np.radians(c["angle1"][rows] - c["angle0"][rows])
+        return cx, cy, radius, phi0, sweep
+
+    def arc_lengths(self):
+        """ Length of every row without sampling: in closed form for straights and arcs, by 
+        Gauss-Legendre quadrature for splines (see utils.hermite_lengths). NaN where not calculated yet."""
+        c = self.columns
+        lengths = np.hypot(c["x1"] - c["x0"], c["y1"] - c["y0"])
+        arcs = self.rows_of(CircularArcAED, CurveCourse, CurveCourse.Lane)
+        _, _, radius, _, sweep = self._arc_geometry(arcs)
+        lengths[arcs] = radius * np.abs(sweep)
+        splines = self.rows_of(*self.SPLINE_CLASSES)
+        lengths[splines] = utils.hermite_lengths(np.column_stack([c["x0"][splines], c["y0"][splines]]), c["angle0"][splines],
+                                                 np.column_stack([c["x1"][splines], c["y1"][splines]]), c["angle1"][splines])
+        return lengths
+
+    def bounding_boxes(self):
+        """ Bounding box of every row in closed form, without sampling.
+
+        Returns:
+            np.ndarray: (rows x 4) xmin, ymin, xmax, ymax; NaN where not calculated yet
+        """
+        c = self.columns
+        boxes = np.column_stack([np.fmin(c["x0"], c["x1"]), np.fmin(c["y0"], c["y1"]),
+                                 np.fmax(c["x0"], c["x1"]), np.fmax(c["y0"], c["y1"])])
+        arcs = self.rows_of(CircularArcAED, CurveCourse, CurveCourse.Lane)
+        boxes[arcs] = utils.arc_bounds(*self._arc_geometry(arcs))
+        splines = self.rows_of(*self.SPLINE_CLASSES)
+        boxes[splines] = utils.hermite_bounds(np.column_stack([c["x0"][splines], c["y0"][splines]]), c["angle0"][splines],
+                                              np.column_stack([c["x1"][splines], c["y1"][splines]]), c["angle1"][splines])
+        return boxes
+
+    def midpoints(self):
+        """ Point in the middle of every row (by curve parameter), in closed form without sampling.
+
+        Returns:
+            np.ndarray: (rows x 2); NaN where not calculated yet
+        """
+        c = self.columns
+        points = np.column_stack([(c["x0"] + c["x1"]) / 2, (c["y0"] + c["y1"]) / 2])
+        arcs = self.rows_of(CircularArcAED, CurveCourse, CurveCourse.Lane)
+        cx, cy, radius, phi0, sweep = self._arc_geometry(arcs)
+        points[arcs] = np.column_stack([cx + radius * np.cos(phi0 + sweep / 2), cy + radius * np.sin(phi0 + sweep / 2)])
+        splines = self.rows_of(*self.SPLINE_CLASSES)
+        a, b, c1, d = utils.hermite_coefficients(np.column_stack([c["x0"][splines], c["y0"][splines]]), c["angle0"][splines],
+                                                 np.column_stack([c["x1"][splines], c["y1"][splines]]), c["angle1"][splines])
+        points[splines] = a / 8 + b / 4 + c1 / 2 + d
+        return points
+
+    def polylines(self, rows=None, tolerance=None):
+        """ Sampled points of rows (default: all which are drawn, i.e. no Courses with lanes) within
+        tolerance (default: config.tolerance), only computed here on demand. Splines are sampled in 
+        batches, the lanes of a CurveCourse together.
+
+        Returns:
+            dict: row -> (points x 2) array
+        """
+        if rows is None:
+            rows = np.setdiff1d(np.arange(len(self)), self.rows_of(StraightCourse, CurveCourse))
+        rows = np.asarray(rows).tolist()
+        c = self.columns
+        splines = self.sample_splines(rows, tolerance)
+        lines, curve_arcs = {}, {}
+        for row in rows:
+            view = self.views[row]
+            if id(view) in splines:
+                lines[row] = splines[id(view)]
+            elif isinstance(view, CircularArcAED):
+                lines[row] = view.polyline(tolerance)
+            elif isinstance(view, CurveCourse.Lane):
+                owner = self.views[c["owner"][row]]
+                if id(owner) not in curve_arcs:
+                    curve_arcs[id(owner)] = owner.lane_polylines(tolerance)
+                lines[row] = curve_arcs[id(owner)][view.lane_id]
+            else:
+                lines[row] = np.array([[c["x0"][row], c["y0"][row]], [c["x1"][row], c["y1"][row]]])
+        return lines
+
+    def sample_splines(self, rows=None, tolerance=None):
+        """ Samples the splines among rows (default: all) from the columns within tolerance (default:
+        config.tolerance), in one batch per amount of points (see utils.sample_hermite_batches).
+
+        Returns:
+            dict: id(view) -> (points x 2) array, see polylines()
+        """
+        splines = self.rows_of(*self.SPLINE_CLASSES)
+        rows = splines if rows is None else np.intersect1d(splines, rows)
+        c = self.columns
+        return utils.sample_hermite_batches([self.views[row] for row in rows.tolist()],
+                                            np.column_stack([c["x0"][rows], c["y0"][rows]]), c["angle0"][rows],
+                                            np.column_stack([c["x1"][rows], c["y1"][rows]]), c["angle1"][rows],
+                                            self.config, tolerance)
+
+
+def column_property(column):
+    def get(self):
+        value = self._store.columns[column].item(self._row)  # Python float, faster than np.float64
+        return None if value != value else value  # NaN -> None
+    def set(self, value):
+        self._store.columns[column][self._row] = np.nan if value is None else value
+    return property(get, set)
+
+
+class SegmentView:
+    """ Base of all view classes, everything but the geometry columns is looked up in the store."""
+    __slots__ = ("_store", "_row")  # the views still get a __dict__ from the segment classes they derive from
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def id(self):
+        return self._store.ids[self._row]
+
+    @id.setter
+    def id(self, value):
+        self._store.ids[self._row] = value
+
+    @property
+    def parent(self):
+        store = self._store
+        owner = store.columns["owner"][self._row]
+        return store.views[owner] if owner >= 0 else store.modules[store.columns["module"][self._row]]
+
+    @property
+    def config(self):
+        return self._store.config
+
+    @property
+    def lane_id(self):
+        return int(self._store.columns["lane"][self._row])
+
+    @property
+    def direction(self):
+        return {1: "right", -1: "left"}.get(int(self._store.columns["direction"][self._row]))
+
+    @direction.setter
+    def direction(self, value):
+        self._store.columns["direction"][self._row] = GeometryStore.DIRECTIONS[value]
+
+    @property
+    def connection0(self):
+        return self._store.links.get((self._row, 0))
+
+    @connection0.setter
+    def connection0(self, value):
+        self._store.links[(self._row, 0)] = value
+
+    @property
+    def connection1(self):
+        return self._store.links.get((self._row, 1))
+
+    @connection1.setter
+    def connection1(self, value):
+        self._store.links[(self._row, 1)] = value
+
+    @property
+    def lanes(self):
+        return [self._store.views[row] for row in self._store.lane_rows(self._row)]
+
+    def add_or_update_lanes(self, new_lanes):
+        """ Writes new_lanes (as created by calculate()) into the rows of the lanes with the same ids."""
+        store = self._store
+        rows = {store.ids[row]: row for row in reversed(store.lane_rows(self._row))}  # first row per id
+        missing = [lane for lane in new_lanes if lane.id not in rows]
+        if missing:
+            rows.update(zip((lane.id for lane in missing), store.add_lanes(self._row, missing)))
+        for new_lane in new_lanes:
+            row = rows[new_lane.id]
+            for name, value in vars(new_lane).items():
+                column = GeometryStore.ATTRIBUTE_COLUMNS.get(name, name)
+                if column in GeometryStore.FLOAT_COLUMNS:
+                    store.columns[column][row] = np.nan if value is None else value
+
+
+def make_view_class(cls):
+    """ Subclass of cls whose geometry attributes are properties on the columns of a GeometryStore."""
+    attributes = {"__doc__": f"View of a {cls.__qualname__} row of a GeometryStore."}
+    for column in GeometryStore.FLOAT_COLUMNS:
+        attributes[column] = column_property(column)
+    for attribute, column in GeometryStore.ATTRIBUTE_COLUMNS.items():
+        if column in GeometryStore.FLOAT_COLUMNS:
+            attributes[attribute] = column_property(column)
+    return type(f"{cls.__name__}View", (SegmentView, cls), attributes)
+
+
+VIEW_CLASSES = [make_view_class(cls) for cls in GeometryStore.CLASSES]
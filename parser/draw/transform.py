@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class Transform:
+    """ 2D affine transformation (rotation, translation, mirroring) as 3x3 homogeneous matrix.
+
+    Besides the matrix, the transformation keeps track of how headings change: a heading (in
+    degrees) becomes sign * heading + angle. Keeping the angle explicitly (instead of deriving it
+    from the matrix) keeps the headings exactly as the step-by-step rotate() / mirror() did.
+    """
+    def __init__(self, matrix=None, angle=0.0, sign=1):
+        self.matrix = np.eye(3) if matrix is None else matrix
+        self.angle = angle
+        self.sign = sign
+
+    @staticmethod
+    def rotation(angle_deg, center=(0, 0)):
+        """ Counter-clockwise rotation by angle_deg around center."""
+        angle_rad = np.radians(angle_deg)
+        c, s = np.cos(angle_rad), np.sin(angle_rad)
+        cx, cy = center
+        matrix = np.array([
+            [c, -s, cx - c * cx + s * cy],
+            [s,  c, cy - s * cx - c * cy],
+            [0,  0, 1]
+        ])
+        return Transform(matrix, angle_deg, 1)
+
+    @staticmethod
+    def translation(offset):
+        matrix = np.eye(3)
+        matrix[0, 2] = offset[0]
+        matrix[1, 2] = offset[1]
+        return Transform(matrix)
+
+    @staticmethod
+    def mirror():
+        """ Mirrors at the x axis (y -> -y, heading -> -heading)."""
+        return Transform(np.diag([1.0, -1.0, 1.0]), 0.0, -1)
+
+    def then(self, other):
+        """ Returns the transformation which first applies self and then other."""
+        return Transform(other.matrix @ self.matrix, other.sign * self.angle + other.angle, other.sign * self.sign)
+
+    def apply_point(self, point):
+        x, y = point
+        m = self.matrix
+        return m[0, 0] * x + m[0, 1] * y + m[0, 2], m[1, 0] * x + m[1, 1] * y + m[1, 2]
+
+    def apply_angle(self, angle_deg):
+        return self.sign * angle_deg + self.angle
+
+
+def stack_transforms(transforms):
+    """ Stacks the distinct Transforms of a list (one per object) into arrays.
+
+    Returns:
+        tuple: (index, matrices, angles, signs), with transforms[i] stored at index[i]
+    """
+    unique = {}
+    index = np.array([unique.setdefault(id(t), (len(unique), t))[0] for t in transforms], dtype=np.intp)
+    transform_list = sorted(unique.values(), key=lambda item: item[0])
+    matrices = np.array([t.matrix for _, t in transform_list]).reshape(-1, 3, 3)
+    angles = np.array([t.angle for _, t in transform_list], dtype=float)
+    signs = np.array([t.sign for _, t in transform_list], dtype=float)
+    return index, matrices, angles, signs
+
+
+def transform_points(matrices, points):
+    """ Applies one 3x3 matrix per point. points: (n x 2) or (n x 3) homogeneous; returns (n x 3)."""
+    points = np.asarray(points, dtype=float)
+    if points.shape[1] == 2:
+        points = np.column_stack([points, np.ones(len(points))])
+    return np.einsum("nij,nj->ni", matrices, points)
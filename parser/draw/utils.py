@@ -1,5 +1,6 @@
 import numpy as np
 import math
+import functools
 
 
 def convert_angle(value, to='degrees'):
@@ -158,8 +159,245 @@ def rotate_around(point, center, angle_degrees):
     return (x_new + cx, y_new + cy)
 
 
+@functools.lru_cache(maxsize=None)
+def hermite_basis(num_points):
+    """
+    The cubic Hermite basis functions h00, h10, h01, h11 at num_points values of t in [0, 1].
+    Computed only once for every num_points.
+
+    Returns:
+        np.ndarray: (num_points x 4), read-only
+    """
+    t = np.linspace(0, 1, num_points)
+    basis = np.stack([2*t**3 - 3*t**2 + 1,
+                      t**3 - 2*t**2 + t,
+                      -2*t**3 + 3*t**2,
+                      t**3 - t**2], axis=1)
+    basis.flags.writeable = False
+    return basis
+
+
+def hermite_geometry(p0, angle0, p1, angle1, tangent_scale=1):
+    """
+    Start point, start tangent, end point and end tangent of n cubic Hermite splines, as used by 
+    hermite_curves.
+
+    Returns:
+        tuple: p0, t0, p1, t1, each (n x 2)
+    """
+    p0 = np.asarray(p0, dtype=float).reshape(-1, 2)
+    p1 = np.asarray(p1, dtype=float).reshape(-1, 2)
+    theta0 = np.radians(np.asarray(angle0, dtype=float).reshape(-1))
+    theta1 = np.radians(np.asarray(angle1, dtype=float).reshape(-1))
+    tangent_length = tangent_scale * np.hypot(p1[:, 0] - p0[:, 0], p1[:, 1] - p0[:, 1])
+    t0 = tangent_length[:, None] * np.stack([np.cos(theta0), np.sin(theta0)], axis=1)
+    t1 = tangent_length[:, None] * np.stack([np.cos(theta1), np.sin(theta1)], axis=1)
+    return p0, t0, p1, t1
+
+
+def hermite_curves(p0, angle0, p1, angle1, num_points, tangent_scale=1):
+    """
+    Samples n cubic Hermite splines at once. The tangents point in the directions angle0 / angle1 
+    and are tangent_scale times as long as the distance between start and end point.
+
+    Parameters:
+        p0, p1: (n x 2) start and end points
+        angle0, angle1: (n,) headings in degrees
+        num_points: amount of points per spline
+
+    Returns:
+        np.ndarray: (n x num_points x 2)
+    """
+    geometry = np.stack(hermite_geometry(p0, angle0, p1, angle1, tangent_scale), axis=1)  # (n x 4 x 2)
+    return np.einsum("pk,nkd->npd", hermite_basis(num_points), geometry)
+
+
+def arc_sample_count(radius, sweep_rad, tolerance, max_points=10000, num_points=None):
+    """
+    Amount of points needed to sample circular arcs, so that no chord of the polyline is further 
+    than tolerance from the arc: the sagitta r * (1 - cos(step / 2)) of every step stays below it.
+
+    Parameters:
+        radius, sweep_rad: scalars or arrays (sign does not matter)
+        num_points: if given, this amount is used instead
+
+    Returns:
+        np.ndarray: int amount of points (at least 2, at most max_points)
+    """
+    radius = np.abs(np.asarray(radius, dtype=float))
+    sweep_rad = np.abs(np.asarray(sweep_rad, dtype=float))
+    if num_points is not None:
+        return np.full(np.broadcast(radius, sweep_rad).shape, num_points)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = 2 * np.arccos(np.clip(1 - tolerance / radius, -1, 1))
+        count = np.where(step > 0, np.ceil(sweep_rad / step), max_points) + 1
+    return np.clip(count, 2, max_points).astype(int)
+
+
+def hermite_sample_count(p0, angle0, p1, angle1, tolerance, max_points=10000, num_points=None, tangent_scale=1):
+    """
+    Amount of points needed to sample cubic Hermite splines (see hermite_curves) within tolerance.
+
+    The chord over a parameter step h deviates at most h^2 / 8 * max|P''(t)| from the spline. P'' 
+    of a cubic is linear in t, so its maximum is at t = 0 or t = 1.
+
+    Returns:
+        np.ndarray: (n,) int amount of points (at least 2, at most max_points)
+    """
+    if num_points is not None:
+        return np.full(len(np.asarray(p0, dtype=float).reshape(-1, 2)), num_points)
+    p0, t0, p1, t1 = hermite_geometry(p0, angle0, p1, angle1, tangent_scale)
+    d = p1 - p0
+    second_derivative = np.maximum(np.linalg.norm(6 * d - 4 * t0 - 2 * t1, axis=1),
+                                   np.linalg.norm(-6 * d + 2 * t0 + 4 * t1, axis=1))
+    count = np.ceil(np.sqrt(second_derivative / (8 * tolerance))) + 1
+    return np.clip(count, 2, max_points).astype(int)
+
+
+def hermite_coefficients(p0, angle0, p1, angle1, tangent_scale=1):
+    """ Power basis P(t) = a t^3 + b t^2 + c t + d of n cubic Hermite splines, each (n x 2)."""
+    p0, t0, p1, t1 = hermite_geometry(p0, angle0, p1, angle1, tangent_scale)
+    a = 2 * p0 + t0 - 2 * p1 + t1
+    b = -3 * p0 - 2 * t0 + 3 * p1 - t1
+    return a, b, t0, p0
+
+
+def hermite_bounds(p0, angle0, p1, angle1, tangent_scale=1):
+    """
+    Bounding boxes of n cubic Hermite splines in closed form, without sampling: per axis, the 
+    extremes are at t = 0, t = 1 or at a root of the quadratic P'(t) inside [0, 1].
+
+    Returns:
+        np.ndarray: (n x 4) xmin, ymin, xmax, ymax
+    """
+    a, b, c, d = hermite_coefficients(p0, angle0, p1, angle1, tangent_scale)
+    # roots of 3a t^2 + 2b t + c (NaN where there is none)
+    qa, qb, qc = 3 * a, 2 * b, c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = np.sqrt(qb**2 - 4 * qa * qc)
+        linear = np.abs(qa) < 1e-12
+        t1 = np.where(linear, -qc / qb, (-qb + root) / (2 * qa))
+        t2 = np.where(linear, np.nan, (-qb - root) / (2 * qa))
+    candidates = np.stack([np.zeros_like(a), np.ones_like(a), t1, t2])  # (4 x n x 2)
+    candidates = np.where((candidates >= 0) & (candidates <= 1), candidates, 0)
+    values = ((a * candidates + b) * candidates + c) * candidates + d
+    return np.column_stack([values.min(axis=0), values.max(axis=0)])
+
+
+@functools.lru_cache(maxsize=None)
+def gauss_legendre(order):
+    """ Nodes (mapped to [0, 1]) and weights of the Gauss-Legendre quadrature of the given order."""
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    return (nodes + 1) / 2, weights / 2
+
+
+def hermite_lengths(p0, angle0, p1, angle1, tangent_scale=1, order=16):
+    """
+    Arc lengths of n cubic Hermite splines. There is no closed form for them, so the speed |P'(t)| 
+    is integrated with Gauss-Legendre quadrature (exact to ~1e-6 relative for road-like splines).
+
+    Returns:
+        np.ndarray: (n,)
+    """
+    a, b, c, _ = hermite_coefficients(p0, angle0, p1, angle1, tangent_scale)
+    t, weights = gauss_legendre(order)
+    t = t[:, None, None]
+    speed = np.linalg.norm((3 * a * t + 2 * b) * t + c, axis=2)  # (order x n)
+    return weights @ speed
+
+
+def arc_bounds(cx, cy, radius, phi0, sweep):
+    """
+    Bounding boxes of n circular arcs in closed form, without sampling: the extremes are the end 
+    points and the points at 0, 90, 180 and 270 deg which lie inside the sweep.
+
+    Parameters:
+        cx, cy, radius: centers and radii
+        phi0: angle of the start point seen from the center (rad)
+        sweep: signed angle from start to end point (rad)
+
+    Returns:
+        np.ndarray: (n x 4) xmin, ymin, xmax, ymax
+    """
+    cx, cy, radius, phi0, sweep = (np.asarray(v, dtype=float).reshape(-1) for v in (cx, cy, radius, phi0, sweep))
+    radius = np.abs(radius)
+    low = np.minimum(phi0, phi0 + sweep)
+    high = np.maximum(phi0, phi0 + sweep)
+    angles = [low, high]
+    for quadrant in range(4):
+        angle = quadrant * np.pi / 2
+        first = angle + 2 * np.pi * np.ceil((low - angle) / (2 * np.pi))  # first one >= low
+        angles.append(np.where(first <= high, first, low))
+    angles = np.stack(angles)  # (6 x n)
+    x = cx + radius * np.cos(angles)
+    y = cy + radius * np.sin(angles)
+    return np.column_stack([x.min(axis=0), y.min(axis=0), x.max(axis=0), y.max(axis=0)])
+
+
+def sample_hermite_batches(keys, p0, angle0, p1, angle1, config, tolerance=None):
+    """ Samples splines in one batch per amount of points; returns id(keys[i]) -> curve."""
+    counts = hermite_sample_count(p0, angle0, p1, angle1, tolerance or config.tolerance, config.max_points,
+                                  config.num_points)
+    curves = {}
+    for count in np.unique(counts).tolist():
+        selected = np.flatnonzero(counts == count)
+        batch = hermite_curves(p0[selected], angle0[selected], p1[selected], angle1[selected], count)
+        for i, curve in zip(selected.tolist(), batch):
+            curves[id(keys[i])] = curve
+    return curves
+
+
+class BlitManager:
+    """
+    Draws animated artists on top of a cached background (blitting). After every full draw of the 
+    canvas the background is copied; update() only restores it, draws the animated artists and blits 
+    the result, so its cost does not depend on how much else is drawn.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect("draw_event", self.on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)  # not drawn by full draws any more, only by this manager
+        if artist not in self.artists:
+            self.artists.append(artist)
+
+    def remove_artist(self, artist):
+        if artist in self.artists:
+            self.artists.remove(artist)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+
+    def update(self):
+        if self.background is None or not getattr(self.canvas, "supports_blit", False):
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+
+def blit_manager(fig):
+    """ The BlitManager of a figure, created on first use."""
+    if getattr(fig, "blit_manager", None) is None:
+        fig.blit_manager = BlitManager(fig.canvas)
+    return fig.blit_manager
+
+
 def blink_line(fig, line, blinks=9, interval=30):
-    """Make a line blink by toggling its visibility."""
+    """Make a line blink by toggling its visibility. Only the line is redrawn (see BlitManager), 
+    afterwards it stays visible on top of the map."""
+    manager = blit_manager(fig)
+    manager.add_artist(line)
     visible = True
     count = 0
 
@@ -168,11 +406,11 @@ def blink_line(fig, line, blinks=9, interval=30):
         if count >= blinks:
             timer.stop()
             line.set_visible(True)
-            fig.canvas.draw()
+            manager.update()
             return
         visible = not visible
         line.set_visible(visible)
-        fig.canvas.draw()
+        manager.update()
         count += 1
 
     timer = fig.canvas.new_timer(interval=interval)
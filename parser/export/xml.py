@@ -1,9 +1,12 @@
+import math
 import xml.etree.ElementTree as ET
 import export.utils
 from enum import Enum
 
 
 class XmlWriter:
+    CELL_SIZE = 0.1  # of the grid over all added points, the default range of find_point
+
     def __init__(self, inverse=False):
         self.inverse = inverse  # use inverse=True, if the lane direction is wrong
         self.network= ET.Element("ots:Network")
@@ -11,6 +14,21 @@ class XmlWriter:
         # ET.register_namespace('ots', "http://example.com/ots")  # optional
         self.tree = ET.ElementTree(self.network)
         self.points = []
+        self.grid = {}  # (i, j) -> points in that cell, see find_point
+
+    def _cell(self, x, y):
+        return math.floor(x / self.CELL_SIZE), math.floor(y / self.CELL_SIZE)
+
+    def _points_near(self, x0, y0, x1, y1):
+        """ All points in the grid cells overlapping the rectangle (x0, y0) - (x1, y1), or all added points,
+        if the rectangle is not finite or covers more cells than there are points."""
+        if not all(map(math.isfinite, (x0, y0, x1, y1))):
+            return self.points
+        i0, j0 = self._cell(x0, y0)
+        i1, j1 = self._cell(x1, y1)
+        if max(i1 - i0 + 1, 0) * max(j1 - j0 + 1, 0) > len(self.points):
+            return self.points
+        return [point for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) for point in self.grid.get((i, j), ())]
 
     def add_point(self, point: export.utils.Point):
         """ <ots:Node Coordinate="(15.9460,-8.5808)" Direction="417.0623 deg(E)" Id="SB" />
@@ -24,6 +42,8 @@ class XmlWriter:
             "Direction": f"{round(float(point.angle), 4)} deg(E)"
         })
         self.points.append(point)
+        if math.isfinite(point.x) and math.isfinite(point.y):  # the others are only found by the linear scan
+            self.grid.setdefault(self._cell(point.x, point.y), []).append(point)
         return node
 
     def add_link(self, link_id, point0: export.utils.Point, point1: export.utils.Point, lane_layout="RIGHT"):
@@ -70,8 +90,11 @@ class XmlWriter:
         parent.insert(0, element)  # insert at the top
 
     def find_point(self, x, y, range=0.1):
+        """ The added point within range of (x, y), None if there is none. Only the points of the grid
+        cells around (x, y) are compared (3 x 3 cells for the default range), not all points."""
         points_found = []
-        for point in self.points:
+        pad = range + 1e-9  # the comparison below decides, the cells only have to cover the range
+        for point in self._points_near(x - pad, y - pad, x + pad, y + pad):
             if abs(point.x - x) <= range and  abs(point.y - y) <= range:
                 points_found.append(point)
         if len(points_found) > 1:
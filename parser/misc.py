@@ -1,10 +1,21 @@
+import os
 import json
+import tempfile
 
 def read_json(file_name):
     with open(file_name, "r") as f:
         return json.load(f)
 
 def write_json(file_name, data):
-    with open(file_name, "w") as f:
-        data = sorted(data)
-        json.dump(data, f, indent=4) 
\ No newline at end of file
+    """ Writes data (sorted) atomically: to a temporary file first, which then replaces file_name."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_name)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            data = sorted(data)
+            json.dump(data, f, indent=4)
+        if os.path.exists(file_name):
+            os.chmod(tmp_path, os.stat(file_name).st_mode & 0o777)  # keep the permissions
+        os.replace(tmp_path, file_name)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -1,6 +1,106 @@
-import re, json
+import re, json, os, time, argparse, hashlib, mmap
+import numpy as np
 from collections import defaultdict
-from matplotlib.widgets import CheckButtons
+
+from config import RES_DIR
+from cache import NpzCache
+
+PARSER_VERSION = 2  # increase whenever the parser output changes, this invalidates the ParseCache
+PORTS = {"Begin": 0, "End": 1}  # same convention as connection0 / connection1 of the drawn objects
+
+
+class Area2Topology:
+    """ Lane connections and neighbours of one *_Area2.cfg as integer arrays.
+
+    Lanes are indexed in the order in which Parser.iter_lane_elements yields them. A port is 
+    encoded as 2 * lane_index + port, with port 0 -> "Begin" and 1 -> "End". All adjacency is stored 
+    in CSR form (offsets + targets), so every lookup is a single slice.
+    """
+    def __init__(self):
+        self.lane_names = []    # e.g. "l12"
+        self.lane_cells = []    # e.g. "lc1"
+        self.lane_index = {}    # "l12" -> lane index
+        self._raw_neighbours = {"L": [], "R": []}  # per lane: list of lane numbers (as in the cfg)
+        self._raw_connections = []                 # ("lc1.l12.Begin", "lc2.l30.End")
+        self.unknown_neighbours = []               # ("l12", "L", "l99") for neighbours which are no lane
+        self.port_offsets = None
+        self.port_targets = None
+        self.left_offsets = None
+        self.left_targets = None
+        self.right_offsets = None
+        self.right_targets = None
+
+    def add_lane(self, cell, name, l_neighbours, r_neighbours):
+        self.lane_index[name] = len(self.lane_names)
+        self.lane_names.append(name)
+        self.lane_cells.append(cell)
+        self._raw_neighbours["L"].append(l_neighbours)
+        self._raw_neighbours["R"].append(r_neighbours)
+
+    def add_connection(self, port_a, port_b):
+        self._raw_connections.append((port_a, port_b))
+
+    def port(self, port_name):
+        """ Converts "lc1.l12.Begin" (or "l12.Begin") into the integer port."""
+        port_split = port_name.split(".")
+        return 2 * self.index(port_split[-2]) + PORTS[port_split[-1]]
+
+    def index(self, lane_name):
+        try:
+            return self.lane_index[lane_name]
+        except KeyError:
+            raise KeyError(f"Lane '{lane_name}' not found in Area2") from None
+
+    @staticmethod
+    def _to_csr(size, pairs):
+        pairs = np.array(pairs, dtype=np.int32).reshape(-1, 2)
+        order = np.argsort(pairs[:, 0], kind="stable")
+        offsets = np.zeros(size + 1, dtype=np.int32)
+        np.cumsum(np.bincount(pairs[:, 0], minlength=size), out=offsets[1:])
+        return offsets, pairs[order, 1]
+
+    def finalize(self):
+        """ Resolves all names into indices. Must be called once after parsing. Neighbours which are 
+        not a lane of this Area2 are left out and listed in unknown_neighbours."""
+        amount_lanes = len(self.lane_names)
+        self.unknown_neighbours = []
+        port_pairs = []
+        for port_a, port_b in self._raw_connections:
+            a = self.port(port_a)
+            b = self.port(port_b)
+            port_pairs.append((a, b))
+            port_pairs.append((b, a))  # connections are undirected ("<->")
+        self.port_offsets, self.port_targets = self._to_csr(2 * amount_lanes, port_pairs)
+        for side in ("L", "R"):
+            pairs = []
+            for i, numbers in enumerate(self._raw_neighbours[side]):
+                for n in numbers:
+                    if f"l{n}" in self.lane_index:
+                        pairs.append((i, self.lane_index[f"l{n}"]))
+                    else:
+                        self.unknown_neighbours.append((self.lane_names[i], side, f"l{n}"))
+            offsets, targets = self._to_csr(amount_lanes, pairs)
+            if side == "L":
+                self.left_offsets, self.left_targets = offsets, targets
+            else:
+                self.right_offsets, self.right_targets = offsets, targets
+        return self
+
+    def connected_ports(self, lane, port):
+        """ Returns all ports (2 * lane_index + port) connected to the given lane index and port."""
+        p = 2 * lane + port
+        return self.port_targets[self.port_offsets[p]:self.port_offsets[p+1]]
+
+    def left_neighbours(self, lane):
+        return self.left_targets[self.left_offsets[lane]:self.left_offsets[lane+1]]
+
+    def right_neighbours(self, lane):
+        return self.right_targets[self.right_offsets[lane]:self.right_offsets[lane+1]]
+
+    def connections(self):
+        """ Returns the connections in the JSON format used under key "Connections"."""
+        return [[port_a, port_b] for port_a, port_b in self._raw_connections]
+
 
 
 class Parser:
@@ -17,30 +117,33 @@ class Parser:
         return [t.strip() for t in tokens if t.strip()]
     
     @staticmethod
-    def parse_to_nested_lists(tokens, current_t=0, parent=None, bracket=None, depth=0):
-        new_obj = []
-        amount_tokens = len(tokens)
-        while current_t < amount_tokens:
-            token = tokens[current_t]
-            current_t += 1
+    def parse_to_nested_lists(tokens):
+        """ Builds the nested lists of tokens. Each "{" / "(" token is followed by a list holding 
+        the tokens up to (and including) its closing token. Uses an explicit stack instead of 
+        recursion, so the nesting depth is not limited by the recursion limit.
+        """
+        root = []
+        stack = [(root, None)]  # (current list, bracket which opened it)
+        for token in tokens:
+            new_obj, bracket = stack[-1]
             new_obj.append(token)
             if "{" in token:
                 if "}" in token:  # if closing bracket is in same token
                     continue
-                current_t, child = Parser.parse_to_nested_lists(tokens, current_t, new_obj, bracket="{", depth=depth+1)
+                child = []
                 new_obj.append(child)
+                stack.append((child, "{"))
             elif "}" in token and bracket=="{":
-                return current_t, new_obj
+                stack.pop()
             elif "(" in token:
                 if ")" in token:  # if closing bracket is in same token
                     continue
-                current_t, child = Parser.parse_to_nested_lists(tokens, current_t, new_obj, bracket="(", depth=depth+1)
+                child = []
                 new_obj.append(child)
+                stack.append((child, "("))
             elif ")" in token and bracket=="(":
-                return current_t, new_obj
-            else:
-                pass
-        return new_obj
+                stack.pop()
+        return root
 
     # def nested_lists_to_json(data, parent=None):
     #     SKIP = ["{", "}", "(", ")", "};", ");"]
@@ -71,57 +174,642 @@ class Parser:
     #         return
     #     return new_obj
 
+    @staticmethod
+    def parse_value(value):
+        """ Parses a single `key = value;` line into (key, float). Raises if it is not numeric."""
+        if value[-1] == ";":
+            value = value[:-1]
+        value_split = value.split("=")
+        key = value_split[0].strip()
+        val = float(value_split[1].strip())
+        return key, val
+
+    @staticmethod
+    def iter_lane_elements(file_path, aed_id=None, topology=None):
+        """ Streams a *_Area2.cfg file line by line and yields one lane element (same dict as 
+        returned by get_lane_elements) as soon as its block is closed. Only the current block 
+        is held in memory, so this works for files of any size.
+
+        If an Area2Topology is passed, the lane neighbours and the Connections block are 
+        collected into it during the same pass (call topology.finalize() afterwards).
+        """
+        for header, last_lane, tokens in Parser.iter_blocks(file_path, topology):
+            yield Parser.lane_element(header, last_lane, tokens, aed_id)
+
+    @staticmethod
+    def iter_blocks(file_path, topology=None):
+        """ Streams a *_Area2.cfg file and yields (header, last LaneCell, value tokens) for every 
+        Straight/Bezier/CircularArc block, e.g. ("Bezier l1", "LaneCell lc1", ["x0 = 1.2;", ...]).
+        The tokens of nested lists (LNeighbours, RNeighbours) are not included.
+        """
+        last_lane = None
+        header = None      # "Bezier l1" etc., waiting for its opening "{"
+        element = None     # header of the element whose values are currently read
+        tokens = None      # value tokens of the current element
+        depth = 0          # bracket depth inside the current element
+        neighbours = None  # neighbours of the current element, {"L": [...], "R": [...]}
+        side = None        # "L" or "R" while reading LNeighbours / RNeighbours
+        paren_depth = 0
+        in_connections = False
+        with open(file_path, "r") as f:
+            for line in f:
+                token = line.strip()
+                if not token:
+                    continue
+                if element is not None:
+                    if side is not None:
+                        if paren_depth == 1 and token.startswith("("):  # e.g. "(13, 1.87017, ("
+                            neighbours[side].append(int(token[1:].split(",")[0]))
+                        paren_depth += token.count("(") - token.count(")")
+                        if paren_depth <= 0:
+                            side = None
+                        continue
+                    if token.startswith(("LNeighbours", "RNeighbours")):
+                        paren_depth = token.count("(") - token.count(")")
+                        if paren_depth > 0:
+                            side = token[0]
+                        continue
+                    if "{" in token and "}" not in token:
+                        depth += 1
+                    elif "}" in token and depth > 0:
+                        depth -= 1
+                    elif "}" in token:
+                        if topology is not None:
+                            cell = last_lane.split(" ")[-1] if last_lane else None
+                            topology.add_lane(cell, element.split(" ")[1], neighbours["L"], neighbours["R"])
+                        yield element, last_lane, tokens
+                        element = None
+                        continue
+                    if depth == 0:
+                        tokens.append(token)
+                    continue
+                if in_connections:
+                    for connection in token.split("}")[0].split(","):
+                        if "<->" in connection:
+                            port_a, port_b = connection.split("<->")
+                            topology.add_connection(port_a.strip(), port_b.strip())
+                    if "}" in token:
+                        in_connections = False
+                    continue
+                if header is not None and token == "{":
+                    element = header
+                    tokens = []
+                    neighbours = {"L": [], "R": []}
+                    header = None
+                    continue
+                header = None
+                if token.startswith("LaneCell"):
+                    last_lane = token
+                elif token.startswith(("Straight", "Bezier", "CircularArc")):
+                    header = token
+                elif token.startswith("Connections") and "{" in token and topology is not None:
+                    in_connections = True
+
     def get_lane_elements(self, data, last_lane=None):
         if isinstance(data, dict):
             raise SyntaxError("Only list should be passed")
-        elif isinstance(data, list):
-            for i in range(len(data)):
-                element = data[i]
-                if str(element).startswith("LaneCell"):
-                    last_lane = element
-                if i < len(data)-2:
-                    expected_curly_brace = data[i+1]
-                    values = data[i+2]
-                    if (str(element).startswith("Straight") \
-                    or str(element).startswith("Bezier") \
-                    or str(element).startswith("CircularArc")) \
-                    and expected_curly_brace == "{" \
-                    and isinstance(values, list):
-                        element_split = element.split(" ")
-                        values_dict = {}
-                        for value in values:
-                            if value[-1] == ";":
-                                value = value[:-1]
-                            try:
-                                value_split = value.split("=")
-                                key = value_split[0].strip()
-                                val = float(value_split[1].strip())
-                                values_dict[key] = val
-                            except: pass
-                        self.elements.append({
-                            "type": element_split[0],
-                            "id": f"{AED_ID}_{element_split[1]}",
-                            "parent": last_lane,
-                            "values": values_dict
-                        })
-                self.get_lane_elements(element, last_lane)
+        if not isinstance(data, list):
+            return self.elements
+        stack = [(data, 0, last_lane)]  # (list, next index, last LaneCell seen in this list)
+        while stack:
+            data, i, last_lane = stack.pop()
+            if i >= len(data):
+                continue
+            element = data[i]
+            is_str = isinstance(element, str)  # str() of a nested list would copy the whole subtree
+            if is_str and element.startswith("LaneCell"):
+                last_lane = element
+            if is_str and i < len(data)-2:
+                expected_curly_brace = data[i+1]
+                values = data[i+2]
+                if element.startswith(("Straight", "Bezier", "CircularArc")) \
+                and expected_curly_brace == "{" \
+                and isinstance(values, list):
+                    self.elements.append(self.lane_element(element, last_lane, values))
+            stack.append((data, i+1, last_lane))
+            if isinstance(element, dict):
+                raise SyntaxError("Only list should be passed")
+            if isinstance(element, list):
+                stack.append((element, 0, last_lane))  # visit the child before the rest of this list
         return self.elements
 
+    @staticmethod
+    def lane_element(header, last_lane, values, aed_id=None):
+        """ Creates the lane element dict from its header (e.g. "Bezier l1") and value tokens."""
+        element_split = header.split(" ")
+        values_dict = {}
+        for value in values:
+            try:
+                key, val = Parser.parse_value(value)
+                values_dict[key] = val
+            except: pass
+        return {
+            "type": element_split[0],
+            "id": f"{AED_ID if aed_id is None else aed_id}_{element_split[1]}",
+            "parent": last_lane,
+            "values": values_dict
+        }
+
+
+class NodeTable:
+    """ Flat table of all bracket blocks of a tokenized cfg file, built without recursion.
+
+    Node 0 is the root (the whole file). Every "{" or "(" token which is not closed on the same line 
+    opens a node. Nodes are stored in pre-order, so the subtree of node i are exactly the nodes 
+    i+1 ... subtree_end[i]-1, and queries like "all Straight blocks under LaneCell lc3" are slices: 
+    find("Straight", under=find("LaneCell lc3", exact=True)[0]).
+
+    Per node:
+        parent:      index of the parent node (-1 for the root)
+        kind:        ROOT, CURLY or ROUND
+        start:       index of the opening token ("{" or e.g. "LNeighbours = (")
+        end:         index after the closing token ("};" or ");")
+        subtree_end: index after the last descendant node
+        lane:        index of the last "LaneCell" token seen before the node was opened (-1 if none)
+        header:      "Bezier l1" for "{" blocks, the opening token itself otherwise
+    """
+    ROOT, CURLY, ROUND = 0, 1, 2
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        parents = [-1]; kinds = [NodeTable.ROOT]; starts = [-1]; ends = [len(tokens)]
+        subtree_ends = [0]; lanes = [-1]
+        stack = [[0, None, -1]]  # [node, bracket, last LaneCell token]
+        for t, token in enumerate(tokens):
+            frame = stack[-1]
+            if token.startswith("LaneCell"):
+                frame[2] = t
+            if "{" in token:
+                if "}" in token:  # if closing bracket is in same token
+                    continue
+                bracket = "{"
+            elif "}" in token and frame[1]=="{":
+                bracket = None
+            elif "(" in token:
+                if ")" in token:  # if closing bracket is in same token
+                    continue
+                bracket = "("
+            elif ")" in token and frame[1]=="(":
+                bracket = None
+            else:
+                continue
+            if bracket is None:  # closes the current node
+                ends[frame[0]] = t+1
+                subtree_ends[frame[0]] = len(parents)
+                stack.pop()
+            else:
+                parents.append(frame[0])
+                kinds.append(NodeTable.CURLY if bracket == "{" else NodeTable.ROUND)
+                starts.append(t); ends.append(len(tokens)); subtree_ends.append(0); lanes.append(frame[2])
+                stack.append([len(parents)-1, bracket, frame[2]])
+        for frame in stack:  # nodes which are not closed until the end of the file
+            subtree_ends[frame[0]] = len(parents)
+        self.parent = np.array(parents, dtype=np.int32)
+        self.kind = np.array(kinds, dtype=np.int8)
+        self.start = np.array(starts, dtype=np.int32)
+        self.end = np.array(ends, dtype=np.int32)
+        self.subtree_end = np.array(subtree_ends, dtype=np.int32)
+        self.lane = np.array(lanes, dtype=np.int32)
+        self.header = np.array([""] + [tokens[s-1] if k == NodeTable.CURLY and tokens[s] == "{" and s > 0 
+                                       else tokens[s] for s, k in zip(starts[1:], kinds[1:])], dtype=str)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, prefix, under=0, kind=None, exact=False):
+        """ Returns the indices of all nodes below node `under` whose header starts with prefix 
+        (a string or a tuple of strings). Use exact=True to look up a node by name, as e.g. 
+        "LaneCell lc1" is also a prefix of "LaneCell lc10"."""
+        offset = under + 1
+        section = slice(offset, self.subtree_end[under])
+        prefixes = prefix if isinstance(prefix, tuple) else (prefix,)
+        found = np.zeros(section.stop - offset, dtype=bool)
+        for p in prefixes:
+            found |= self.header[section] == p if exact else np.char.startswith(self.header[section], p)
+        if kind is not None:
+            found &= self.kind[section] == kind
+        return np.flatnonzero(found) + offset
+
+    def children(self, node):
+        offset = node + 1
+        return np.flatnonzero(self.parent[offset:self.subtree_end[node]] == node) + offset
+
+    def direct_tokens(self, node):
+        """ Returns the tokens of a node's list, without the tokens of its child nodes."""
+        tokens = []
+        t = self.start[node] + 1
+        for child in self.children(node):
+            tokens.extend(self.tokens[t:self.start[child]+1])  # the opening token belongs to the parent
+            t = self.end[child]
+        tokens.extend(self.tokens[t:self.end[node]])
+        return tokens
+
+    def lane_elements(self, under=0, aed_id=None):
+        """ Same elements as Parser.get_lane_elements, but for all blocks below node `under`."""
+        elements = []
+        for node in self.find(("Straight", "Bezier", "CircularArc"), under, kind=NodeTable.CURLY):
+            if self.tokens[self.start[node]] != "{":
+                continue
+            lane = self.tokens[self.lane[node]] if self.lane[node] >= 0 else None
+            elements.append(Parser.lane_element(self.header[node], lane, self.direct_tokens(node), aed_id))
+        return elements
+
+
+class LaneTable:
+    """ Columnar table of all lane elements of a cfg file.
+
+    Every field (x0, y0, Angle0, ..., Direction, OBSID, Length) is one typed NumPy array with a 
+    validity mask, so whole columns can be used instead of one dict per element. Comment values 
+    like "# Length = 45.8931" are stored as column "Length". Values which are not numeric are kept 
+    as string columns. ParseCache writes its entries from this table.
+    """
+    INT_COLUMNS = ("HeadingLeft", "HeadingRight", "HeadingStraight", "OBSID", "TargetRoute", "Direction")
+
+    def __init__(self, types, ids, parents, columns, masks, comments=()):
+        self.types = types
+        self.ids = ids
+        self.parents = parents    # "" for elements outside of any LaneCell
+        self.columns = columns    # name -> array
+        self.masks = masks        # name -> bool array
+        self.comments = set(comments)  # columns read from "# key = value" lines
+
+    @classmethod
+    def from_file(cls, file_path, aed_id=None, topology=None):
+        return cls.from_blocks(Parser.iter_blocks(file_path, topology), aed_id)
+
+    @classmethod
+    def from_blocks(cls, blocks, aed_id=None):
+        if aed_id is None:
+            aed_id = AED_ID
+        types, ids, parents = [], [], []
+        raw = {}  # name -> ([row, ...], [raw value, ...])
+        comments = set()
+        for row, (header, last_lane, tokens) in enumerate(blocks):
+            element_split = header.split(" ")
+            types.append(element_split[0])
+            ids.append(f"{aed_id}_{element_split[1]}")
+            parents.append(last_lane if last_lane is not None else "")
+            for token in tokens:
+                if "=" not in token:
+                    continue
+                key, value = token.rstrip(";").split("=", 1)
+                key = key.strip()
+                if key.startswith("#"):
+                    key = key[1:].strip()
+                    comments.add(key)
+                rows, values = raw.setdefault(key, ([], []))
+                rows.append(row)
+                values.append(value.strip())
+
+        columns, masks = {}, {}
+        for key, (rows, values) in raw.items():
+            typed = cls.typed_column(key, values)
+            column = np.zeros(len(types), dtype=typed.dtype)
+            column[rows] = typed
+            mask = np.zeros(len(types), dtype=bool)
+            mask[rows] = True
+            columns[key] = column
+            masks[key] = mask
+        return cls(np.array(types, dtype=str), np.array(ids, dtype=str), 
+                   np.array(parents, dtype=str), columns, masks, comments)
+
+    @classmethod
+    def typed_column(cls, key, values):
+        """ int32 for the INT_COLUMNS if all values are whole numbers, float64 for other numeric values 
+        (e.g. a Direction of 0.5 is not truncated) and str if any value is not numeric."""
+        try:
+            floats = np.array([float(v) for v in values], dtype=np.float64)
+        except ValueError:
+            return np.array(values, dtype=str)
+        int32 = np.iinfo(np.int32)
+        if key in cls.INT_COLUMNS and np.all(np.isfinite(floats)) and np.all(floats == np.round(floats)) \
+                and np.all((floats >= int32.min) & (floats <= int32.max)):
+            return floats.astype(np.int32)
+        return floats
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def valid(self, name):
+        return self.masks[name]
+
+    def key(self, name):
+        """ The key of column `name` in the lane element dicts, e.g. "# Length" for column "Length"."""
+        return f"# {name}" if name in self.comments else name
+
+    def numeric_columns(self):
+        """ Returns {name: (float64 column, mask)} of all columns with numeric values. The values of 
+        string columns are converted one by one; those which are not numeric are masked out, as 
+        get_lane_elements drops them."""
+        numeric = {}
+        for name, column in self.columns.items():
+            mask = self.masks[name]
+            if column.dtype.kind in "if":
+                numeric[name] = (column.astype(np.float64), mask)
+                continue
+            values, mask = np.zeros(len(self)), mask.copy()
+            for i in np.flatnonzero(mask).tolist():
+                try:
+                    values[i] = float(column[i])
+                except ValueError:
+                    mask[i] = False
+            if mask.any():
+                numeric[name] = (values, mask)
+        return numeric
+
+    def element(self, i, numeric=None):
+        """ Returns row i as lane element dict (the format of get_lane_elements)."""
+        if numeric is None:
+            numeric = self.numeric_columns()
+        return {
+            "type": str(self.types[i]),
+            "id": str(self.ids[i]),
+            "parent": str(self.parents[i]) or None,
+            "values": {self.key(name): float(column[i]) for name, (column, mask) in numeric.items() if mask[i]}
+        }
+
+    def to_elements(self):
+        numeric = self.numeric_columns()
+        return [self.element(i, numeric) for i in range(len(self))]
+
+
+class CfgIndex:
+    """ Byte offset index of the LaneCells and Straight/Bezier/CircularArc blocks of a cfg file.
+
+    The file is memory-mapped and scanned once; afterwards single lanes are parsed on demand. The 
+    index is saved next to the file (<file>.idx) and reused as long as size and mtime of the cfg 
+    did not change.
+    """
+    INDEX_VERSION = 1
+    PATTERN = re.compile(rb"^[ \t]*(LaneCell|Straight|Bezier|CircularArc)[ \t]+(\S+)[ \t]*\r?\n[ \t]*\{[ \t]*\r?$", re.M)
+
+    def __init__(self, file_path, aed_id=None, persist=True):
+        self.file_path = file_path
+        self.index_path = f"{file_path}.idx"
+        self.aed_id = aed_id if aed_id is not None else AED_ID
+        self._file = open(file_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        stat = os.stat(file_path)
+        self._stat = [stat.st_size, stat.st_mtime_ns]
+        self.lanes = None  # "l145" -> [header start, block end, "LaneCell lc3"]
+        self.cells = None  # "lc3" -> [header start, lane names...]
+        if not (persist and self.load()):
+            self.scan()
+            if persist:
+                self.save()
+
+    def scan(self):
+        self.lanes = {}
+        self.cells = {}
+        last_lane = None
+        for match in CfgIndex.PATTERN.finditer(self._mmap):
+            e_type = match.group(1).decode()
+            name = match.group(2).decode()
+            if e_type == "LaneCell":
+                last_lane = f"{e_type} {name}"
+                self.cells[name] = [match.start()]
+                continue
+            end = self._mmap.find(b"}", match.end())
+            end = self._mmap.find(b"\n", end) if end >= 0 else -1
+            end = end if end >= 0 else len(self._mmap)
+            self.lanes[name] = [match.start(), end, last_lane]
+            if last_lane is not None:
+                self.cells[last_lane.split(" ")[-1]].append(name)
+        return self
+
+    def load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        if data.get("version") != CfgIndex.INDEX_VERSION or data.get("stat") != self._stat:
+            return False
+        self.lanes = data["lanes"]
+        self.cells = data["cells"]
+        return True
+
+    def save(self):
+        with open(self.index_path, "w") as f:
+            json.dump({"version": CfgIndex.INDEX_VERSION, "stat": self._stat, 
+                       "lanes": self.lanes, "cells": self.cells}, f)
+
+    def get(self, lane_name):
+        """ Parses only the block of the given lane (e.g. "l145") into a lane element dict."""
+        try:
+            start, end, last_lane = self.lanes[lane_name]
+        except KeyError:
+            raise KeyError(f"Lane '{lane_name}' not found in {self.file_path}") from None
+        tokens = [t.strip() for t in self._mmap[start:end].decode().split("\n") if t.strip()]
+        return Parser.lane_element(tokens[0], last_lane, tokens[2:], self.aed_id)
+
+    def cell(self, cell_name):
+        """ Parses all lanes of the given LaneCell (e.g. "lc3")."""
+        return [self.get(lane_name) for lane_name in self.cells[cell_name][1:]]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ParseCache(NpzCache):
+    """ On-disk cache of parsed *_Area2.cfg files.
+
+    Entries are keyed by the content hash of the cfg, the AED id and PARSER_VERSION, and stored as 
+    .npz files: one float matrix (+ validity mask) for all values, string tables for ids, types, 
+    parents and connections and CSR arrays for the neighbours. The least recently used entries 
+    are removed once the cache grows larger than max_bytes.
+    """
+    def __init__(self, cache_dir=None, max_bytes=None):
+        super().__init__(cache_dir if cache_dir is not None else CACHE_DIR, 
+                         max_bytes if max_bytes is not None else MAX_CACHE_BYTES)
+
+    def key(self, file_path, aed_id):
+        sha = hashlib.sha1(f"{PARSER_VERSION}|{aed_id}|".encode())
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def get_lane_elements(self, file_path, aed_id=None):
+        """ Returns (elements, topology) of the cfg, from the cache if the file did not change.
+        The topology is already finalized.
+        """
+        if aed_id is None:
+            aed_id = AED_ID
+        key = self.key(file_path, aed_id)
+        cached = self.load(key, aed_id)
+        if cached is not None:
+            return cached
+        topology = Area2Topology()
+        table = LaneTable.from_file(file_path, aed_id, topology)
+        topology.finalize()
+        self.store(key, table, topology)
+        return table.to_elements(), topology
+
+    def load(self, key, aed_id):
+        data = self.read(key)
+        if data is None:
+            return None
+        keys = data["keys"].tolist()
+        values = data["values"].tolist()
+        mask = data["mask"]
+        elements = []
+        topology = Area2Topology()
+        neighbours = {}
+        for side in ("L", "R"):
+            offsets = data[f"{side}_offsets"]
+            numbers = data[f"{side}_numbers"].tolist()
+            neighbours[side] = [numbers[offsets[i]:offsets[i+1]] for i in range(len(offsets)-1)]
+        parents = [parent if has_parent else None  # elements outside of any LaneCell have no parent
+                   for parent, has_parent in zip(data["parents"].tolist(), data["has_parent"].tolist())]
+        for i, (e_type, e_id, parent) in enumerate(zip(data["types"].tolist(), data["ids"].tolist(), parents)):
+            row = values[i]
+            elements.append({
+                "type": e_type,
+                "id": e_id,
+                "parent": parent,
+                "values": {k: row[j] for j, k in enumerate(keys) if mask[i, j]}
+            })
+            topology.add_lane(parent.split(" ")[-1] if parent else None, e_id[len(aed_id)+1:], 
+                              neighbours["L"][i], neighbours["R"][i])
+        for port_a, port_b in data["connections"].tolist():
+            topology.add_connection(port_a, port_b)
+        return elements, topology.finalize()
+
+    def store(self, key, table, topology):
+        numeric = table.numeric_columns()
+        columns = [column for column, _ in numeric.values()]
+        masks = [mask for _, mask in numeric.values()]
+        arrays = {
+            "keys": np.array([table.key(name) for name in numeric], dtype=str),
+            "values": np.column_stack(columns) if columns else np.zeros((len(table), 0)),
+            "mask": np.column_stack(masks) if masks else np.zeros((len(table), 0), dtype=bool),
+            "types": table.types,
+            "ids": table.ids,
+            "parents": table.parents,
+            "has_parent": table.parents != "",
+            "connections": np.array(topology.connections(), dtype=str).reshape(-1, 2),
+        }
+        for side in ("L", "R"):
+            lists = topology._raw_neighbours[side]
+            arrays[f"{side}_offsets"] = np.concatenate(([0], np.cumsum([len(l) for l in lists]))).astype(np.int32)
+            arrays[f"{side}_numbers"] = np.array([n for l in lists for n in l], dtype=np.int32)
+        self.write(key, arrays)
+
+    def invalidate(self, file_path=None, aed_id=None):
+        """ Removes the entry of one cfg file, or the whole cache if no file is given."""
+        if file_path is not None:
+            self.remove(self.key(file_path, aed_id if aed_id is not None else AED_ID))
+        else:
+            self.clear()
+
+
 AED_ID = "03"  # when using multiple AEDs in one map, these should all be different
 FILE_NAME = "MotorwayWeavingSection_Area2"
+CFG_DIR = os.path.join(RES_DIR, "cfg")
+JSON_PARTS_DIR = os.path.join(RES_DIR, "json", "parts")
+CACHE_DIR = os.path.join(RES_DIR, "cache")
+MAX_CACHE_BYTES = 64 * 1024 * 1024
 
-if __name__ == "__main__":
-    with open(f'./parser/res/cfg/{FILE_NAME}.cfg', 'r') as f:
-        raw_text = f.read()
 
-    parser = Parser()
-    tokens = parser.tokenize(raw_text)
-    nested_lists = parser.parse_to_nested_lists(tokens)
-    elements = parser.get_lane_elements(nested_lists)
+def convert_file(file_name, aed_id=AED_ID, module_id="aed1", use_cache=True):
+    """ Converts CFG_DIR/<file_name>.cfg into JSON_PARTS_DIR/<file_name>.json.
+
+    Returns:
+        tuple: (file_name, amount of elements, seconds needed)
+    """
+    start = time.perf_counter()
+    file_path = f"{CFG_DIR}/{file_name}.cfg"
+    if use_cache:
+        elements, topology = ParseCache().get_lane_elements(file_path, aed_id)
+    else:
+        topology = Area2Topology()
+        elements = list(Parser.iter_lane_elements(file_path, aed_id=aed_id, topology=topology))
+        topology.finalize()
+    for lane, side, neighbour in topology.unknown_neighbours:
+        print(f"--  {file_name}: {side} neighbour {neighbour} of {lane} is no lane of the Area2, skipped")
 
-    with open(f"./parser/res/json/parts/{FILE_NAME}.json", "w") as json_file:
+    with open(f"{JSON_PARTS_DIR}/{file_name}.json", "w") as json_file:
         json.dump({
             "type": "Area2", 
-            "id": "aed1",
-            "elements": elements
+            "id": module_id,
+            "elements": elements,
+            "Connections": topology.connections()
         }, json_file, indent=4)
+    return file_name, len(elements), time.perf_counter() - start
+
+
+def generated_parts():
+    """ Returns {file name: (AED id, module id)} of every part in JSON_PARTS_DIR which was written 
+    by convert_file from a cfg in CFG_DIR. The ids are taken from the part, as the scenarios and 
+    exclude files refer to its lanes by them. Other parts (e.g. put together by hand from Courses 
+    and Area2s) are not included.
+    """
+    parts = {}
+    for name in sorted(os.listdir(JSON_PARTS_DIR)):
+        file_name, extension = os.path.splitext(name)
+        if extension != ".json" or not os.path.exists(f"{CFG_DIR}/{file_name}.cfg"):
+            continue
+        with open(os.path.join(JSON_PARTS_DIR, name), "r") as f:
+            part = json.load(f)
+        if not isinstance(part, dict) or part.get("type") != "Area2" or not part.get("elements"):
+            continue
+        aed_ids = {element["id"].rsplit("_", 1)[0] for element in part["elements"]}
+        if len(aed_ids) > 1:
+            raise ValueError(f"{name} contains lanes of several AED ids: {', '.join(sorted(aed_ids))}")
+        parts[file_name] = (aed_ids.pop(), part["id"])
+    return parts
+
+
+def convert_all(file_names=None, workers=None, use_cache=True):
+    """ Converts the given cfg files (default: all with a generated part, see generated_parts) 
+    again in a process pool, keeping the AED id and module id of their parts. Files without such a 
+    part are not converted (KeyError), as their AED id is not known.
+    """
+    from concurrent.futures import ProcessPoolExecutor  # imported here, as it pulls in multiprocessing
+
+    parts = generated_parts()
+    if file_names is None:
+        file_names = sorted(parts)
+        cfg_names = sorted(os.path.splitext(f)[0] for f in os.listdir(CFG_DIR) if f.endswith(".cfg"))
+        for file_name in cfg_names:
+            if file_name not in parts:
+                print(f"--  {file_name:<40} skipped, no part generated from it in {JSON_PARTS_DIR}")
+    missing = [file_name for file_name in file_names if file_name not in parts]
+    if missing:
+        raise KeyError(f"No part generated from {', '.join(missing)} in {JSON_PARTS_DIR}")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(convert_file, file_name, *parts[file_name], use_cache=use_cache)
+                   for file_name in file_names]
+        for future in futures:
+            file_name, amount_elements, seconds = future.result()
+            print(f"{parts[file_name][0]}  {file_name:<40} {amount_elements:>5} elements  {seconds:.3f} s")
+    print(f"Converted {len(file_names)} files in {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Convert *_Area2.cfg files into JSON parts.")
+    arg_parser.add_argument("--all", action="store_true", 
+                            help=f"convert every cfg with a generated part in {JSON_PARTS_DIR} again, in parallel")
+    arg_parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    arg_parser.add_argument("--no-cache", action="store_true", help="always parse, do not use the ParseCache")
+    arg_parser.add_argument("--clear-cache", action="store_true", help=f"remove all entries from {CACHE_DIR}")
+    args = arg_parser.parse_args()
+
+    if args.clear_cache:
+        ParseCache().invalidate()
+    if args.all:
+        convert_all(workers=args.workers, use_cache=not args.no_cache)
+    else:
+        convert_file(FILE_NAME, use_cache=not args.no_cache)
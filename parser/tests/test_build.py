@@ -0,0 +1,88 @@
+import os
+import random
+import numpy as np
+import pytest
+
+import build
+import misc
+from config import Config
+from draw.course import StraightCourse
+
+SCENARIOS = ["Scenario01", "Scenario03"]  # with several Area2 modules (so the pool is used) and CustomConnections
+
+
+def geometry(objects):
+    """ Ids and (x, y, angle) of all end points of the built objects."""
+    points = [point for obj in objects for point in obj.get_points()]
+    return [point.id for point in points], np.array([(point.x, point.y, point.angle) for point in points], dtype=float)
+
+
+@pytest.mark.parametrize("file_name", SCENARIOS)
+def test_custom_connections_in_any_order(file_name):
+    map_content = build.load_scenario(file_name)
+    ids, expected = geometry(build.build(map_content))
+    connections = map_content["CustomConnections"]
+    rng = random.Random(0)
+    for order in [connections[::-1]] + [rng.sample(connections, len(connections)) for _ in range(3)]:
+        order_ids, points = geometry(build.build(dict(map_content, CustomConnections=order)))
+        assert order_ids == ids
+        np.testing.assert_allclose(points, expected, atol=1e-9)
+
+
+@pytest.fixture
+def config():
+    # with the exclusions loaded, as in run.py: only the geometry settings are sent to the workers
+    config = Config(exclude_file=os.path.join(Config().json_dir, "exclude03.json"))
+    assert len(config.lines_to_exclude) > 0
+    return config
+
+
+@pytest.mark.parametrize("file_name", SCENARIOS)
+def test_pool_equals_serial(config, file_name):
+    map_content = build.load_scenario(file_name, config)
+    serial = build.build_objects(map_content, config, workers=1)
+    pool = build.build_objects(map_content, config, workers=2)
+    assert [obj.id for obj in pool] == [obj.id for obj in serial]
+    assert all(obj.config is config for obj in pool)
+    serial_arrays, pool_arrays = build.objects_to_arrays(serial), build.objects_to_arrays(pool)
+    assert sorted(pool_arrays) == sorted(serial_arrays)
+    for name in serial_arrays:
+        np.testing.assert_array_equal(pool_arrays[name], serial_arrays[name], err_msg=name)
+
+    ids, expected = geometry(build.build(map_content, config=config, workers=1))
+    pool_ids, points = geometry(build.build(map_content, config=config, workers=2))
+    assert pool_ids == ids
+    np.testing.assert_array_equal(points, expected)
+
+
+def test_scenario_cache_ignores_exclusions(tmp_path, monkeypatch):
+    exclude_file = tmp_path / "exclude.json"
+    misc.write_json(str(exclude_file), [])
+    config = Config(exclude_file=str(exclude_file))
+    cache = build.ScenarioCache(str(tmp_path / "cache"), config=config)
+    ids, expected = geometry(cache.build_scenario("Scenario03"))
+    config.lines_to_exclude.add(ids[0][:-2])
+    config.lines_to_exclude.flush()
+
+    def build_objects(*args, **kwargs):
+        raise AssertionError("not restored from the cache")
+    monkeypatch.setattr(build, "build_objects", build_objects)
+    cached_ids, points = geometry(cache.build_scenario("Scenario03"))
+    assert cached_ids == ids
+    np.testing.assert_array_equal(points, expected)
+
+
+def test_add_lanes_grows_the_store_once():
+    store = build.build(build.load_scenario("Scenario01")).store
+    course = next(obj for obj in store.objects if isinstance(obj, StraightCourse))
+    lanes = course.lanes
+    rows, ids = len(store), [lane.id for lane in lanes]
+    new_lanes = [StraightCourse.Lane(lane_id, f"{course.id}-lane{lane_id}", 0, 0, 1, 1, 0, 0, course)
+                 for lane_id in (len(lanes), len(lanes) + 1)]
+    updated = StraightCourse.Lane(0, ids[0], 2, 3, 4, 5, 0, 0, course)
+    course.add_or_update_lanes([updated] + new_lanes)
+    assert len(store) == rows + 2
+    assert all(len(column) == rows + 2 for column in store.columns.values())
+    assert [lane.id for lane in course.lanes] == ids + [lane.id for lane in new_lanes]
+    assert (course.lanes[0].x0, course.lanes[0].y1) == (2, 5)
+    assert course.lanes[-1].parent is course and course.lanes[-1].x1 == 1
@@ -0,0 +1,44 @@
+import pickle
+import pytest
+
+import misc
+from config import Config, Exclusions
+
+
+def test_config_pickles_without_exclusions(tmp_path):
+    exclude_file = tmp_path / "exclude.json"
+    misc.write_json(str(exclude_file), ["01_l1", "01_l2"])
+    config = Config(exclude_file=str(exclude_file))
+    config.lines_to_exclude.add("01_l3")
+    copy = pickle.loads(pickle.dumps(config))
+    assert copy.tolerance == config.tolerance and copy.exclude_file == config.exclude_file
+    assert copy.lines_to_exclude is not config.lines_to_exclude
+    assert sorted(copy.lines_to_exclude) == ["01_l1", "01_l2"]  # the change is not saved yet
+    config.lines_to_exclude.flush()
+    assert misc.read_json(str(exclude_file)) == ["01_l1", "01_l2", "01_l3"]
+
+
+def test_undo_redo():
+    exclusions = Exclusions(ids=["a"])
+    changed = []
+    exclusions.listeners.append(changed.append)
+    exclusions.add("b")
+    exclusions.discard("a")
+    assert exclusions.undo() == "a" and list(exclusions) == ["a", "b"]
+    assert exclusions.undo() == "b" and list(exclusions) == ["a"]
+    assert exclusions.undo() is None
+    assert exclusions.redo() == "b" and list(exclusions) == ["a", "b"]
+    exclusions.add("c")  # a new change drops the undone ones
+    assert exclusions.redo() is None
+    assert exclusions.undo() == "c" and exclusions.redo() == "c" and list(exclusions) == ["a", "b", "c"]
+    assert changed == ["b", "a", "a", "b", "b", "c", "c", "c"]
+
+
+def test_listener_must_not_change_exclusions():
+    exclusions = Exclusions()
+    exclusions.listeners.append(lambda id: exclusions.add(id + "_other"))
+    with pytest.raises(RuntimeError):
+        exclusions.add("a")
+    assert list(exclusions) == ["a"]
+    exclusions.listeners.clear()
+    assert exclusions.undo() == "a" and list(exclusions) == []
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pytest
+
+from parse import ParseCache, Parser, Area2Topology, LaneTable, CFG_DIR
+
+CFG_FILES = sorted(os.path.join(CFG_DIR, f) for f in os.listdir(CFG_DIR) if f.endswith(".cfg"))
+
+NO_LANE_CELL_CFG = """define Area2 Test
+{
+    Straight l1
+    {
+        x0 = 1.5;
+        y0 = -2;
+    };
+    LaneCell lc1
+    {
+        Bezier l2
+        {
+            x0 = 3;
+            LNeighbours = (
+                (1, 0.5, (
+                ));
+            );
+        };
+    };
+    Connections = {
+        lc1.l2.End <-> l1.Begin
+    };
+}
+"""
+
+
+def parse(file_path, aed_id):
+    topology = Area2Topology()
+    elements = list(Parser.iter_lane_elements(file_path, aed_id=aed_id, topology=topology))
+    return elements, topology.finalize()
+
+
+def assert_same_topology(a, b):
+    assert a.lane_names == b.lane_names
+    assert a.lane_cells == b.lane_cells
+    assert a.connections() == b.connections()
+    for name in ("port_offsets", "port_targets", "left_offsets", "left_targets", "right_offsets", "right_targets"):
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+
+
+@pytest.mark.parametrize("file_path", CFG_FILES, ids=os.path.basename)
+def test_round_trip(tmp_path, file_path):
+    cache = ParseCache(str(tmp_path))
+    elements, topology = parse(file_path, "07")
+    missed = cache.get_lane_elements(file_path, "07")
+    assert len(os.listdir(tmp_path)) == 1
+    hit = cache.get_lane_elements(file_path, "07")
+    for cached_elements, cached_topology in (missed, hit):
+        assert cached_elements == elements
+        assert_same_topology(cached_topology, topology)
+
+
+def test_round_trip_without_lane_cell(tmp_path):
+    file_path = tmp_path / "Test_Area2.cfg"
+    file_path.write_text(NO_LANE_CELL_CFG)
+    cache = ParseCache(str(tmp_path / "cache"))
+    elements, topology = parse(str(file_path), "07")
+    assert elements[0]["parent"] is None
+    cache.get_lane_elements(str(file_path), "07")
+    cached_elements, cached_topology = cache.get_lane_elements(str(file_path), "07")
+    assert cached_elements == elements
+    assert_same_topology(cached_topology, topology)
+    assert list(cached_topology.left_neighbours(1)) == [0]
+    assert list(cached_topology.connected_ports(0, 0)) == [3]
+
+
+def test_lane_table_types(tmp_path):
+    file_path = tmp_path / "Test_Area2.cfg"
+    file_path.write_text(NO_LANE_CELL_CFG
+                         .replace("y0 = -2;", "y0 = -2;\n        OBSID = 12;\n        Direction = 0.5;\n        r = abc;")
+                         .replace("x0 = 3;", "x0 = 3;\n        OBSID = 7.0;\n        Direction = 1;\n        r = 2.5;"))
+    table = LaneTable.from_file(str(file_path), "07")
+    assert table["OBSID"].dtype == np.int32 and table["OBSID"].tolist() == [12, 7]
+    assert table["Direction"].tolist() == [0.5, 1.0]  # not truncated to an integer
+    assert table["r"].dtype.kind == "U" and table["r"].tolist() == ["abc", "2.5"]
+    elements = table.to_elements()
+    assert elements == list(Parser.iter_lane_elements(str(file_path), aed_id="07"))
+    assert "r" not in elements[0]["values"] and elements[1]["values"]["r"] == 2.5
+
+    cache = ParseCache(str(tmp_path / "cache"))
+    assert cache.get_lane_elements(str(file_path), "07")[0] == elements
+    assert cache.get_lane_elements(str(file_path), "07")[0] == elements
+
+
+def test_key_changes_with_content_and_aed_id(tmp_path):
+    file_path = tmp_path / "Test_Area2.cfg"
+    file_path.write_text(NO_LANE_CELL_CFG)
+    cache = ParseCache(str(tmp_path / "cache"))
+    key = cache.key(str(file_path), "07")
+    assert cache.key(str(file_path), "08") != key
+    file_path.write_text(NO_LANE_CELL_CFG.replace("1.5", "1.6"))
+    assert cache.key(str(file_path), "07") != key
+
+
+def test_eviction_and_invalidate(tmp_path):
+    cache = ParseCache(str(tmp_path), max_bytes=0)
+    cache.get_lane_elements(CFG_FILES[0], "07")
+    assert os.listdir(tmp_path) == []  # too large for the cache
+
+    cache = ParseCache(str(tmp_path))
+    for file_path in CFG_FILES:
+        cache.get_lane_elements(file_path, "07")
+    assert len(os.listdir(tmp_path)) == len(CFG_FILES)
+    cache.invalidate(CFG_FILES[0], "07")
+    assert len(os.listdir(tmp_path)) == len(CFG_FILES) - 1
+    cache.invalidate()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,89 @@
+import itertools
+import random
+from types import SimpleNamespace
+import pytest
+
+from export.utils import Point
+from export.xml import XmlWriter
+
+CELL = XmlWriter.CELL_SIZE
+
+
+def make_writer(coordinates):
+    writer = XmlWriter()
+    for i, (x, y) in enumerate(coordinates):
+        writer.add_point(Point(x, y, 0.0, SimpleNamespace(id=f"l{i}"), 0))
+    return writer
+
+
+def find_by_scan(writer, x, y, range=0.1):
+    """ find_point without the grid, comparing all points."""
+    found = [p for p in writer.points if abs(p.x - x) <= range and abs(p.y - y) <= range]
+    if len(found) > 1:
+        raise LookupError
+    return found[0] if found else None
+
+
+def test_point_on_cell_border():
+    # points exactly on the borders (and corners) of the cells, found from every neighbouring cell
+    for x, y in [(0.0, 0.0), (CELL, 0.0), (-CELL, 2 * CELL), (3 * CELL, -3 * CELL), (123.4, -56.7)]:
+        writer = make_writer([(x, y)])
+        point, = writer.points
+        for dx, dy in itertools.product((-0.1, -0.05, -1e-12, 0.0, 1e-12, 0.05, 0.1), repeat=2):
+            assert writer.find_point(x + dx, y + dy) is find_by_scan(writer, x + dx, y + dy)
+            if abs(dx) < 0.1 and abs(dy) < 0.1:
+                assert writer.find_point(x + dx, y + dy) is point
+        assert writer.find_point(x + 0.1 + 1e-6, y) is None
+        assert writer.find_point(x, y - 0.1 - 1e-6) is None
+
+
+def test_ranges_larger_and_smaller_than_a_cell():
+    writer = make_writer([(0.05, 0.05), (1.0, 1.0)])
+    assert writer.find_point(0.4, 0.4, range=0.36) is writer.points[0]  # 4 x 4 cells, more than points: scanned
+    assert writer.find_point(0.4, 0.4, range=0.34) is None
+    assert writer.find_point(1.0, 1.029, range=0.03) is writer.points[1]
+    assert writer.find_point(1.0, 1.031, range=0.03) is None
+
+
+def test_more_than_one_point_raises():
+    # in the same cell, and in neighbouring cells
+    for x, y, coordinates in [(0.0, 0.0, [(0.01, 0.01), (0.02, 0.02)]), 
+                              (0.1, 0.0, [(0.099, 0.0), (0.101, 0.0)]), 
+                              (0.0, 0.0, [(-0.001, -0.001), (0.001, 0.001)]),
+                              (0.0, 0.0, [(-0.1, 0.0), (0.1, 0.0)])]:
+        writer = make_writer(coordinates)
+        with pytest.raises(LookupError):
+            writer.find_point(x, y)
+        assert writer.find_point(x, y, range=0.0005) is None
+
+
+def test_same_as_scan():
+    rng = random.Random(0)
+    coordinates = [(round(rng.uniform(-5, 5), 1), round(rng.uniform(-5, 5), 1)) for _ in range(300)]
+    writer = make_writer(set(coordinates))
+    for _ in range(2000):
+        x, y = round(rng.uniform(-5.2, 5.2), 2), round(rng.uniform(-5.2, 5.2), 2)
+        for r in (0.01, 0.05, 0.1, 0.25):
+            try:
+                expected = find_by_scan(writer, x, y, r)
+            except LookupError:
+                with pytest.raises(LookupError):
+                    writer.find_point(x, y, r)
+            else:
+                assert writer.find_point(x, y, r) is expected
+
+
+def test_large_ranges_and_non_finite_input():
+    nan, inf = float("nan"), float("inf")
+    writer = make_writer([(0.0, 0.0), (nan, 1.0), (inf, 2.0)])
+    assert writer.find_point(0.0, 0.0) is writer.points[0]
+    assert writer.find_point(0.0, 0.0, range=1e300) is writer.points[0]  # scanned, not cell by cell
+    assert writer.find_point(5.0, 5.0, range=4.0) is None
+    for x, y in [(nan, 0.0), (0.0, nan), (nan, 1.0), (inf, 2.0), (-inf, 0.0)]:
+        assert writer.find_point(x, y) is None
+    with pytest.raises(LookupError):
+        writer.find_point(0.0, 0.0, range=inf)  # the point at x = inf is in range, as in the scan
+    with pytest.raises(LookupError):
+        find_by_scan(writer, 0.0, 0.0, range=inf)
+    with pytest.raises(LookupError):
+        make_writer([(0.0, 0.0), (1e6, -1e6)]).find_point(0.0, 0.0, range=1e7)